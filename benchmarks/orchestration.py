@@ -0,0 +1,319 @@
+"""
+Offline benchmarks of the orchestration and download paths, on synthetic zones and a FakeBackend.
+
+    python benchmarks/orchestration.py --zones 100 1000 10000 --output results.json
+    python benchmarks/orchestration.py --zones 100 1000 --compare results.json
+
+startWorkflow (with the default engine and morphology, with engine='images' and with morphology='raster') builds Earth
+Engine graphs client-side: the ee module is initialized offline from a recorded list of the Earth Engine algorithms
+(fixtures/algorithms.json), the requests still going to the FakeBackend. The fixture can be
+recorded again (this needs credentials) with:
+
+    python benchmarks/orchestration.py --ee-project ee-glourb --record-algorithms
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import shapely
+import geopandas as gpd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from glourbee import (
+    backend,
+    instrumentation,
+    assets_management,
+    collection
+)
+
+ALGORITHMS_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'algorithms.json')
+
+# Variantes de startWorkflow mesurées (nom du benchmark -> options)
+WORKFLOW_VARIANTS = {
+    'startWorkflow': {},
+    'startWorkflow_images': {'engine': 'images'},
+    'startWorkflow_raster': {'morphology': 'raster'},
+}
+
+# Mesures où une hausse est une régression
+LOWER_IS_BETTER = ['rpc', 'seconds', 'graph_seconds', 'payload_bytes', 'peak_memory_mb']
+HIGHER_IS_BETTER = ['tasks_per_second', 'rows_per_second']
+
+
+class PayloadBackend(instrumentation.InstrumentedBackend):
+    """
+    Instrumented backend also measuring the serialized size of the exported tables.
+    """
+
+    def __init__(self, inner: backend.Backend, recording: instrumentation.Recording):
+        super().__init__(inner, recording)
+        self.payload_bytes = 0
+
+    def export_table(self, collection, description: str, asset_id: str):
+        if isinstance(collection, dict):
+            self.payload_bytes += len(json.dumps(collection))
+        else:
+            import ee
+            self.payload_bytes += len(ee.serializer.toJSON(collection))
+
+        return super().export_table(collection, description, asset_id)
+
+
+def recordAlgorithms(ee_project: str, path: str = ALGORITHMS_FIXTURE):
+    """
+    Record the Earth Engine algorithms signatures, as returned by ee.data.getAlgorithms(), in the fixture file.
+    """
+    import ee
+    ee.Initialize(project=ee_project)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(ee.data.getAlgorithms(), f, sort_keys=True)
+
+
+def initializeOffline(path: str = ALGORITHMS_FIXTURE):
+    """
+    Initialize the ee module without credentials nor network, from the recorded algorithms signatures.
+
+    This goes through the offline test harness shipped with earthengine-api (ee.apitestcase), which keeps up with the
+    ee internals it has to stub. The Earth Engine objects can then be built and serialized, but not computed.
+    """
+    from ee import apitestcase
+
+    with open(path) as f:
+        algorithms = json.load(f)
+
+    # Le harnais lit les signatures avec apitestcase.GetAlgorithms (par défaut, celles des tests d'earthengine-api)
+    apitestcase.GetAlgorithms = lambda: algorithms
+    apitestcase.ApiTestCase().InitializeApi()
+
+
+def syntheticZones(n_zones: int, path: str):
+    """
+    Write n_zones square zones of 500 m on a grid, in Lambert-93.
+    """
+    side = int(n_zones ** 0.5) + 1
+    gpd.GeoDataFrame({'DGO_FID': range(n_zones)},
+                     geometry=[shapely.box(700000 + (i % side) * 600, 6600000 + (i // side) * 600,
+                                           700000 + (i % side) * 600 + 500, 6600000 + (i // side) * 600 + 500)
+                               for i in range(n_zones)],
+                     crs=2154).to_file(path)
+
+
+def metricsTable(fids: list, n_dates: int):
+    """
+    Synthetic metrics table of some zones, shaped like the zones_metrics exports.
+    """
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'id': f'{fid}_{d}',
+                'properties': {'DGO_FID': fid, 'DATE': f'{1990 + d // 12}-{d % 12 + 1:02}-01', 'CLOUD_SCORE': 0,
+                               'COVERAGE_SCORE': 100, 'SCALE': 30, 'WATER_AREA': 12.0, 'WATER_POLYGONS': 3,
+                               'MEAN_MNDWI': 0.1, 'MEAN_NDVI': 0.3, 'AC_AREA': 20.0},
+                'geometry': {'type': 'Polygon', 'coordinates': [[[0, 0], [0.005, 0], [0.005, 0.005], [0, 0]]]},
+            }
+            for fid in fids for d in range(n_dates)
+        ]
+    }
+
+
+def measure(inner: backend.Backend, prepare, memory: bool = True, repeat: int = 1):
+    """
+    Measure the duration, the requests and the peak of memory allocations of a benchmarked operation.
+
+    prepare() sets up a fresh run and returns the operation to run. The operation is timed repeat times (the best
+    duration is kept), then runs once more with tracemalloc (which slows down the allocations too much to be timed)
+    unless memory is False.
+    """
+    durations = []
+    for _ in range(repeat):
+        func = prepare()
+        recording = instrumentation.Recording()
+        instrumented = PayloadBackend(inner, recording)
+        with backend.useBackend(instrumented):
+            start = time.perf_counter()
+            result = func()
+            durations.append(time.perf_counter() - start)
+
+    metrics = {
+        'seconds': round(min(durations), 4),
+        'rpc': len(recording.events),
+        'rpc_by_call': recording.counts(),
+        'payload_bytes': instrumented.payload_bytes,
+    }
+
+    if memory:
+        func = prepare()
+        tracemalloc.start()
+        with backend.useBackend(inner):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metrics['peak_memory_mb'] = round(peak / 2**20, 2)
+
+    return result, metrics
+
+
+def benchmarkSize(n_zones: int, workdir: str, latency: float, n_dates: int, with_ee: bool, memory: bool = True, repeat: int = 1):
+    fake = backend.FakeBackend(latency=latency, seed=0,
+                               table_factory=lambda asset_id, collection: {'type': 'FeatureCollection', 'features': []})
+    results = {}
+
+    zones_file = os.path.join(workdir, f'zones_{n_zones}.gpkg')
+    syntheticZones(n_zones, zones_file)
+
+    with backend.useBackend(fake):
+        # Upload des zones (une tache par zone), jusqu'à la fin des taches
+        def prepare_upload():
+            zones = assets_management.ExtractionZones(local_file=zones_file)
+
+            def upload():
+                zones.upload_to_gee(silent=True)
+                zones.wait_for_tasks(silent=True, min_interval=0.01)
+                return zones
+            return upload
+        zones, results['upload_to_gee'] = measure(fake, prepare_upload, memory, repeat)
+        results['upload_to_gee']['tasks_per_second'] = round((n_zones + 1) / results['upload_to_gee']['seconds'], 1)
+
+        # Workflow : construction des graphes et soumission des taches, pour chaque moteur et mode de morphologie
+        for name, options in WORKFLOW_VARIANTS.items():
+            if not with_ee:
+                results[name] = {'skipped': 'ee not initialized (no algorithms fixture)'}
+                continue
+
+            from glourbee import workflow
+
+            def prepare_start():
+                return lambda: workflow.startWorkflow(zones, start='1990-01-01', end='1990-12-31', silent=True, **options)
+            metrics_ds, results[name] = measure(fake, prepare_start, memory, repeat)
+            results[name]['tasks_per_second'] = round((n_zones + 1) / results[name]['seconds'], 1)
+
+            # Temps de construction des graphes seuls, sans démarrer les taches
+            properties = metrics_ds.config['features'][0]['properties']
+            collection_params = {key: properties[key] for key in ['satellite_type', 'start', 'end', 'cloud_filter', 'cloud_masking', 'mosaic_same_day',
+                                                                  'watermask_expression', 'activechannel_expression', 'vegetation_expression']}
+            targets = workflow.exportTargets(metrics_ds, workflow.timeWindows(properties['start'], properties['end']))
+
+            start = time.perf_counter()
+            workflow.prepareTasks(metrics_ds, targets, collection_params, properties)
+            results[name]['graph_seconds'] = round(time.perf_counter() - start, 4)
+
+        # Téléchargement de métriques synthétiques, sans cache local
+        metrics_ds = assets_management.MetricsDataset(parent_zones=zones, asset_uuid=f'bench_metrics_{n_zones}')
+        for asset in zones.gee_assets:
+            fid = int(asset['name'].split('_')[-1])
+            fake.add_table(f'{metrics_ds.gee_dir}/{metrics_ds.name}_{fid:04}', metricsTable([fid], n_dates))
+        metrics_ds.update_gee_state()
+
+        output_file = os.path.join(workdir, f'metrics_{n_zones}.parquet')
+        def prepare_download():
+            return lambda: metrics_ds.download(output_file, silent=True, overwrite=True, cache_dir=os.path.join(workdir, 'cache'))
+        _, results['download'] = measure(fake, prepare_download, memory, repeat)
+        results['download']['rows_per_second'] = round(n_zones * n_dates / results['download']['seconds'], 1)
+
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float):
+    """
+    Compare two benchmark results and list the regressions above the tolerance.
+    """
+    regressions = []
+    for size, benchmarks in current['results'].items():
+        for name, metrics in benchmarks.items():
+            reference = baseline['results'].get(size, {}).get(name, {})
+            for metric, value in metrics.items():
+                if not isinstance(value, (int, float)) or not isinstance(reference.get(metric), (int, float)) or not reference[metric]:
+                    continue
+
+                ratio = value / reference[metric]
+                print(f'{size:>6} zones  {name:<20} {metric:<17} {reference[metric]:>12} -> {value:>12}  ({ratio:.2f}x)')
+
+                if metric in LOWER_IS_BETTER and ratio > 1 + tolerance or metric in HIGHER_IS_BETTER and ratio < 1 - tolerance:
+                    regressions.append(f'{name} {metric} at {size} zones: {reference[metric]} -> {value}')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--zones', type=int, nargs='+', default=[100, 1000, 10000], help='Numbers of synthetic zones.')
+    parser.add_argument('--latency', type=float, default=0.002, help='Latency of each fake request, in seconds.')
+    parser.add_argument('--dates', type=int, default=24, help='Number of metrics rows per zone for the download benchmark.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs of each operation (the best one is kept). Defaults to 3.')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the (slow) peak memory measures.')
+    parser.add_argument('--ee-project', help='Initialize the ee module with this project instead of the recorded algorithms fixture.')
+    parser.add_argument('--record-algorithms', action='store_true', help='Record the algorithms fixture with --ee-project, then exit.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', help='Compare the results with this JSON file of a previous run.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Relative change reported as a regression. Defaults to 0.2.')
+    args = parser.parse_args()
+
+    if args.record_algorithms:
+        if not args.ee_project:
+            parser.error('--record-algorithms needs --ee-project')
+        recordAlgorithms(args.ee_project)
+        return
+
+    with_ee = True
+    if args.ee_project:
+        import ee
+        ee.Initialize(project=args.ee_project)
+    elif os.path.exists(ALGORITHMS_FIXTURE):
+        initializeOffline()
+    else:
+        print(f'{ALGORITHMS_FIXTURE} not found: startWorkflow is not benchmarked', file=sys.stderr)
+        with_ee = False
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = None
+
+    workdir = tempfile.mkdtemp(prefix='glourbee_bench_')
+    catalog_dir = collection.CATALOG_DIR
+    collection.CATALOG_DIR = os.path.join(workdir, 'catalog')
+
+    try:
+        results = {
+            'meta': {'commit': commit, 'python': platform.python_version(), 'latency': args.latency,
+                     'dates': args.dates, 'repeat': args.repeat, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': {},
+        }
+        for n_zones in args.zones:
+            print(f'Benchmarking {n_zones} zones', file=sys.stderr)
+            results['results'][str(n_zones)] = benchmarkSize(n_zones, workdir, args.latency, args.dates, with_ee, not args.no_memory, args.repeat)
+    finally:
+        collection.CATALOG_DIR = catalog_dir
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\nRegressions:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,25 @@
 import ee
-import tempfile
 import os
+import re
+import copy
 import uuid
 import json
 import ee.batch
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 
 from typing import Union
-from urllib.request import urlretrieve
-from time import sleep
 from datetime import datetime
-from shapely.geometry import shape
+
+from glourbee import (
+    backend,
+    instrumentation,
+    zones_metrics,
+    task_management,
+    download_management,
+    collection
+)
 
 
 class GlourbEEDataset:
@@ -19,6 +27,7 @@ class GlourbEEDataset:
     Class for managing extraction zones in Earth Engine.
     """
 
+    @instrumentation.phase('load')
     def __init__(self,
                  ee_project_name: str = 'ee-glourb',
                  asset_uuid: str = None):
@@ -27,8 +36,16 @@ class GlourbEEDataset:
         """
 
         self.ee_project_name = ee_project_name
-        self.gee_assets = []
         self.config = None
+        self.packs = None
+        self.submission_errors = []
+
+        # Etat des assets, rafraichi à la demande (voir update_gee_state)
+        self._gee_assets = []
+        self._child_metrics = []
+        self._gee_state = 'none'
+        self._config_exported = False
+        self._stale = False
 
         self.asset_uuid = asset_uuid
         if not asset_uuid:
@@ -36,65 +53,174 @@ class GlourbEEDataset:
         else:
             # Vérifier si une config existe lorsqu'un asset_uuid est fourni
             try:              
-                dir_content = ee.data.listAssets({'parent': self.gee_dir})
+                dir_content = backend.getBackend().list_assets(self.gee_dir)
                 config_asset = f'{self.gee_dir}/config'
-                if config_asset in [asset['name'] for asset in dir_content['assets']]:
-                    self.config = ee.FeatureCollection(config_asset).getInfo()
+                if config_asset in [asset['name'] for asset in dir_content]:
+                    self.config = backend.getBackend().read_table(config_asset)
             except:
                 print(f'Asset {self.gee_dir} config not available.')
                 self.config = None
 
+        self.tracker = task_management.TaskTracker(self.ee_project_name, self.asset_uuid)
+
+    @property
+    def n_assets(self):
+        """
+        Number of table assets expected in a complete dataset (one per zone, or one per pack for packed datasets).
+        """
+        return self.packs if self.packs else self.len
+
+    @property
+    def gee_assets(self):
+        """
+        Table assets of the dataset. Refreshed lazily after new tasks are submitted.
+        """
+        if self._stale:
+            self.update_gee_state(tasks=False)
+        return self._gee_assets
+
+    @property
+    def child_metrics(self):
+        """
+        Metrics datasets folders in the dataset folder. Refreshed lazily after new tasks are submitted.
+        """
+        if self._stale:
+            self.update_gee_state(tasks=False)
+        return self._child_metrics
+
+    @property
+    def gee_state(self):
+        """
+        Upload state of the dataset: 'none', 'partial (n/N)' or 'complete'. Refreshed lazily after new tasks are submitted.
+        """
+        if self._stale:
+            self.update_gee_state(tasks=False)
+        return self._gee_state
+
+    @property
+    def config_exported(self):
+        """
+        Whether the config table of the dataset exists in Earth Engine. Refreshed lazily after new tasks are submitted.
+        """
+        if self._stale:
+            self.update_gee_state(tasks=False)
+        return self._config_exported
+
+    @property
+    def linked_tasks(self):
+        """
+        Computation, upload or export operations linked to the dataset.
+        """
+        return self.tracker.tasks
+
+    def counted_assets(self, assets: list):
+        """
+        Table assets counted to check if the dataset is complete.
+
+        Args:
+            assets (list): Table assets, as returned by ee.data.listAssets().
+        """
+        return assets
 
-    def update_gee_state(self):
+    @instrumentation.phase('state')
+    def update_gee_state(self, tasks: bool = True):
         """
         Update the state of the asset in Earth Engine.
+
+        Args:
+            tasks (bool, optional): If True, also refresh the linked tasks from the full Earth Engine operations listing. Defaults to True.
         """
 
         # Check assets
         root_dir = os.path.dirname(self.gee_dir)
-        root_content = ee.data.listAssets({'parent': root_dir})
-        root_names = [asset['name'] for asset in root_content['assets']]
+        root_content = backend.getBackend().list_assets(root_dir)
+        root_names = [asset['name'] for asset in root_content]
 
         if not self.gee_dir in root_names:
-            ee.data.createAsset({'type': 'Folder'}, self.gee_dir)
-            self.gee_assets = []
-            self.child_metrics = []
+            backend.getBackend().create_folder(self.gee_dir)
+            self._gee_assets = []
+            self._child_metrics = []
+            self._config_exported = False
         else:
-            dir_content = ee.data.listAssets({'parent': self.gee_dir})
-            self.gee_assets = [
-                asset for asset in dir_content['assets'] if asset['type'] == 'TABLE' and '/config' not in asset['name']]
-            self.child_metrics = [
-                asset for asset in dir_content['assets'] if asset['type'] == 'FOLDER']
+            dir_content = backend.getBackend().list_assets(self.gee_dir)
+            self._gee_assets = [
+                asset for asset in dir_content if asset['type'] == 'TABLE' and '/config' not in asset['name']]
+            self._child_metrics = [
+                asset for asset in dir_content if asset['type'] == 'FOLDER']
+            self._config_exported = f'{self.gee_dir}/config' in [asset['name'] for asset in dir_content]
+
+        self._gee_state = 'none'
+        counted = self.counted_assets(self._gee_assets)
 
-        self.gee_state = 'none'
+        if len(counted) > 0:
+            self._gee_state = f'partial ({len(counted)}/{self.n_assets})'
 
-        if len(self.gee_assets) > 0:
-            self.gee_state = f'partial ({len(self.gee_assets)}/{self.len})'
+        if len(counted) == self.n_assets:
+            self._gee_state = 'complete'
 
-        if len(self.gee_assets) == self.len:
-            self.gee_state = 'complete'
+        self._stale = False
 
         # Check linked tasks
-        ee_tasks = ee.data.listOperations()
-        self.linked_tasks = [
-            t for t in ee_tasks if f'{self.asset_uuid}' in t['metadata']['description'] and t['metadata']['state'] != 'COMPLETED']
+        if tasks:
+            self.tracker.refresh()
 
-    def wait_for_tasks(self, silent: bool = False):
-        tasks = self.linked_tasks
+    def track_task(self, task: ee.batch.Task):
+        """
+        Record a started task locally, without refreshing the full GEE state.
 
-        running_tasks = [t for t in tasks if t['metadata']['state'] in [
-            'RUNNING', 'SUBMITTED', 'PENDING']]
-        while len(running_tasks) > 0:
-            if not silent:
-                print(f'\rwaiting for {len(running_tasks)} tasks to finish', end=" ")
-            
-            sleep(10)
-            self.update_gee_state()
-            tasks = self.linked_tasks
-            running_tasks = [
-                t for t in tasks if t['metadata']['state'] in ['RUNNING', 'SUBMITTED', 'PENDING']]
-            
+        Args:
+            task (ee.batch.Task): Started task.
+        """
+        self.tracker.track(task)
+        self._stale = True
+
+    @instrumentation.phase('submit')
+    def start_tasks(self, tasks: list, max_workers: int = 8, silent: bool = False):
+        """
+        Start export tasks concurrently and keep track of the submission errors.
+
+        Args:
+            tasks (list): ee.batch.Task objects to start.
+            max_workers (int, optional): Maximum number of concurrent start requests. Defaults to 8.
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+        """
+        submissions = task_management.startTasks(tasks, max_workers=max_workers, silent=silent)
+        self.submission_errors = [s for s in submissions if s['error']]
+
+        for s in submissions:
+            if not s['error']:
+                self.track_task(s['item'])
+
+        return submissions
+
+    @instrumentation.phase('wait')
+    def wait_for_tasks(self, silent: bool = False, on_completed=None, on_failed=None, on_cancelled=None, **monitor_kwargs):
+        """
+        Wait for the linked tasks to finish, polling only the linked operations.
+
+        Args:
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+            on_completed (callable, optional): Called with the operation dict when a task succeeds. Defaults to None.
+            on_failed (callable, optional): Called with the operation dict when a task fails. Defaults to None.
+            on_cancelled (callable, optional): Called with the operation dict when a task is cancelled. Defaults to None.
+            **monitor_kwargs: Polling options passed to task_management.TaskMonitor.
+
+        Returns:
+            task_management.TaskMonitor: The monitor, with per-task timings available with timings().
+        """
+        monitor = task_management.TaskMonitor(self.tracker,
+                                              on_completed=on_completed,
+                                              on_failed=on_failed,
+                                              on_cancelled=on_cancelled,
+                                              **monitor_kwargs)
+        monitor.wait(silent=silent)
+
+        # Les assets ont changé : rafraichir l'état à la prochaine lecture
+        self._stale = True
+
+        return monitor
 
+    @instrumentation.phase('cancel')
     def cancel_linked_tasks(self, silent: bool = False):
         """
         Cancel the linked computation, upload or export running tasks.
@@ -102,33 +228,76 @@ class GlourbEEDataset:
         self.update_gee_state()
 
         for i, task in enumerate(self.linked_tasks):
-            ee.data.cancelOperation(task['name'])
+            backend.getBackend().cancel_operation(task['name'])
 
             if not silent:
                 print(
                     f'\rTask {i+1}/{len(self.linked_tasks)} cancelled', end=" ")
 
-    def delete(self):
-        """
-        Delete the assets and all the assets from Earth Engine.
+    @instrumentation.phase('delete')
+    def delete(self, silent: bool = False, dry_run: bool = False, max_workers: int = 8, progress=None):
         """
+        Delete the dataset folder and all its content, at any depth, from Earth Engine.
 
-        child_assets = ee.data.listAssets({'parent': self.gee_dir})['assets']
+        The tree is listed level by level, then deleted from the deepest level up. Each level is listed and deleted
+        concurrently.
 
-        if len(child_assets) > 0:
-            for child in child_assets:
-                if child['type'] in ['FOLDER','IMAGE_COLLECTION']:
-                    
-                    subchild_assets = ee.data.listAssets({'parent': child['name']})['assets']
+        Args:
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+            dry_run (bool, optional): If True, only list the assets that would be deleted. Defaults to False.
+            max_workers (int, optional): Maximum number of concurrent requests. Defaults to 8.
+            progress (callable, optional): Called as progress(done, total, asset_name) after each deleted asset. Defaults to None.
+
+        Returns:
+            list: Asset IDs deleted (or to delete with dry_run), in deletion order.
+        """
 
-                    if len(subchild_assets) > 0:
-                        for subchild in subchild_assets:
-                            ee.data.deleteAsset(subchild['name'])
-                    
-                ee.data.deleteAsset(child['name'])
+        # Lister l'arborescence niveau par niveau
+        levels = [[self.gee_dir]]
+        folders = [self.gee_dir]
+        while folders:
+            outcomes = task_management.runConcurrently(backend.getBackend().list_assets,
+                                                       folders,
+                                                       max_workers=max_workers)
+            errors = [o for o in outcomes if o['error']]
+            if errors:
+                raise errors[0]['error']
+
+            children = [child for o in outcomes for child in o['result']]
+            if children:
+                levels.append([child['name'] for child in children])
+            folders = [child['name'] for child in children if child['type'] in ['FOLDER', 'IMAGE_COLLECTION']]
+
+        # Supprimer en partant des feuilles
+        to_delete = [name for level in reversed(levels) for name in level]
+        if dry_run:
+            return to_delete
+
+        deleted = []
+
+        def report(done, total, outcome):
+            if not outcome['error']:
+                deleted.append(outcome['item'])
+            if not silent:
+                print(f'\rDeleted {len(deleted)}/{len(to_delete)} assets', end=" ")
+            if progress:
+                progress(len(deleted), len(to_delete), outcome['item'])
+
+        for level in reversed(levels):
+            outcomes = task_management.runConcurrently(backend.getBackend().delete_asset, level, max_workers=max_workers, progress=report)
+            errors = [o for o in outcomes if o['error']]
+            if errors:
+                # Les dossiers parents ne peuvent pas être supprimés tant qu'ils ne sont pas vides
+                raise RuntimeError(f'{len(errors)} assets could not be deleted: ' +
+                                   ', '.join(f'{o["item"]} ({o["error"]})' for o in errors))
 
-        ee.data.deleteAsset(self.gee_dir)
         self.config = None
+        self._stale = True
+
+        # gee_dir = projects/{project}/assets/extraction_zones/{zones_uuid}[/{metrics_uuid}]
+        collection.invalidateCatalog(self.ee_project_name, self.gee_dir.split('/')[4])
+
+        return deleted
 
 
 class ExtractionZones(GlourbEEDataset):
@@ -144,7 +313,7 @@ class ExtractionZones(GlourbEEDataset):
         self.gee_dir = f'projects/{ee_project_name}/assets/extraction_zones/{asset_uuid}'
         super().__init__(ee_project_name, asset_uuid)
 
-        self.child_metrics = []
+        self.zones_index = {}
 
         # Vérifier que le fichier local existe ou que l'asset est déjà sur GEE
         self.local_file = local_file
@@ -159,6 +328,8 @@ class ExtractionZones(GlourbEEDataset):
             self.type = self.config['features'][0]['properties']['type'] if 'type' in self.config['features'][0]['properties'] else None
             self.description = self.config['features'][0]['properties']['description'] if 'description' in self.config['features'][0]['properties'] else None
             self.zones_author = self.config['features'][0]['properties']['zones_author'] if 'zones_author' in self.config['features'][0]['properties'] else None
+            self.packs = self.config['features'][0]['properties'].get('packs') or None
+            packs_index = self.config['features'][0]['properties'].get('packs_index')
         else:
             # Vérifier que le champ FID existe
             gdf = gpd.read_file(self.local_file)
@@ -174,19 +345,68 @@ class ExtractionZones(GlourbEEDataset):
 
         # Récupérer les infos sur le dossier GEE
         self.gee_dir = f'projects/{self.ee_project_name}/assets/extraction_zones/{self.asset_uuid}'
+
+        # Reconstruire l'index FID -> asset des zones empaquetées
+        if self.config and self.packs and packs_index:
+            self.zones_index = {int(fid): self.pack_asset(pack) for fid, pack in json.loads(packs_index).items()}
+
         self.update_gee_state()
 
-    def upload_to_gee(self, simplify_tolerance: int = 15, silent: bool = False, overwrite: bool = False):
+    def pack_asset(self, pack: int):
+        """
+        Get the asset ID of a pack of zones.
+
+        Args:
+            pack (int): Pack number.
+        """
+        return f'{self.gee_dir}/{self.name}_pack{pack:04}'
+
+    def all_zones(self):
+        """
+        Get all the zones of the dataset as one ee.FeatureCollection.
+        """
+        return ee.FeatureCollection([ee.FeatureCollection(asset['name']) for asset in self.gee_assets]).flatten()
+
+    def bounds(self):
+        """
+        Get the bounding box of all the zones, as an ee.Geometry.
+        """
+        bbox = self.config['features'][0]['properties'].get('bbox') if self.config else None
+        if bbox:
+            return ee.Geometry.Rectangle(json.loads(bbox), proj='EPSG:4326', geodesic=False)
+
+        # Zones uploaded before the bbox was stored in the config: compute it once on Earth Engine
+        if not getattr(self, '_bounds', None):
+            self._bounds = backend.getBackend().get_info(self.all_zones().geometry().bounds(maxError=100))
+
+        return ee.Geometry(self._bounds)
+
+    def zone_asset(self, fid: int):
+        """
+        Get the asset ID containing a zone.
+
+        Args:
+            fid (int): Feature ID of the zone.
+        """
+        if self.packs:
+            return self.zones_index[int(fid)]
+        return f'{self.gee_dir}/{self.name}_{int(fid):04}'
+
+    @instrumentation.phase('upload')
+    def upload_to_gee(self, simplify_tolerance: int = 15, silent: bool = False, overwrite: bool = False, packs: int = None, max_workers: int = 8):
         """
         Upload the extraction zones to Earth Engine.
 
         Args:
             simplify_tolerance (int, optional): Tolerance for simplifying the geometries. Defaults to 15.
             silent (bool, optional): If True, do not print progress. Defaults to False.
+            packs (int, optional): If set, group the zones into this number of table assets instead of one asset per zone. Defaults to None.
+            max_workers (int, optional): Maximum number of upload tasks started concurrently. Defaults to 8.
         """
 
         assert simplify_tolerance >= 1, 'Simplify tolerance should be >= 1'
         assert not self.config or overwrite == True, 'Config already exists in GEE project. Set overwrite to True to overwrite extraction zones and metrics associated.'
+        assert not packs or 1 <= packs <= self.len, f'Number of packs should be between 1 and the number of zones ({self.len}).'
 
         if overwrite:
             self.delete()
@@ -198,6 +418,17 @@ class ExtractionZones(GlourbEEDataset):
         
         gdf.to_crs(4326, inplace=True)
 
+        # Répartir les zones dans les paquets
+        self.packs = packs
+        self.zones_index = {}
+        packs_index = {}
+        if packs:
+            pack_rows = np.array_split(np.arange(len(gdf)), packs)
+            for pack, rows in enumerate(pack_rows):
+                for fid in gdf.iloc[rows][self.fid_field]:
+                    packs_index[int(fid)] = pack
+                    self.zones_index[int(fid)] = self.pack_asset(pack)
+
         # Mise à jour de la config
         self.config = {
             'type': 'FeatureCollection',
@@ -208,6 +439,9 @@ class ExtractionZones(GlourbEEDataset):
                 'type': 'String',
                 'description': 'String',
                 'zones_author': 'String', 
+                'packs': 'Integer',
+                'packs_index': 'String',
+                'bbox': 'String',
                 },
             'features': [
                 {
@@ -220,6 +454,9 @@ class ExtractionZones(GlourbEEDataset):
                         'type': self.type,
                         'description': self.description,
                         'zones_author': self.zones_author,
+                        'packs': self.packs or 0,
+                        'packs_index': json.dumps(packs_index) if packs else '',
+                        'bbox': json.dumps(gdf.total_bounds.tolist()),
                     },
                     'geometry': {
                         'type': 'Point',
@@ -228,32 +465,45 @@ class ExtractionZones(GlourbEEDataset):
                 }
             ]
         }
-        task = ee.batch.Export.table.toAsset(
-            collection=ee.FeatureCollection(self.config),
+        task = backend.getBackend().export_table(
+            collection=self.config,
             description=f'upload {self.asset_uuid} config',
-            assetId=f'{self.gee_dir}/config'
+            asset_id=f'{self.gee_dir}/config'
         )
         task.start()
+        self.track_task(task)
+        collection.invalidateCatalog(self.ee_project_name, self.asset_uuid)
+
+        # Boucler sur les paquets de zones
+        tasks = []
+        if packs:
+            for pack, rows in enumerate(pack_rows):
+                fc = {'type': 'FeatureCollection', 'features': list(gdf.iloc[rows].iterfeatures())}
+
+                # Créer la tache d'export
+                tasks.append(backend.getBackend().export_table(
+                    collection=fc,
+                    description=f'upload {self.asset_uuid} pack {pack:04}',
+                    asset_id=self.pack_asset(pack)
+                ))
 
         # Boucler sur les entités
-        for row in gdf.iterfeatures():
-            fc = ee.FeatureCollection([ee.Feature(row)])
-            fid = row['properties'][self.fid_field]
+        else:
+            for row in gdf.iterfeatures():
+                fc = {'type': 'FeatureCollection', 'features': [row]}
+                fid = row['properties'][self.fid_field]
 
-            assetId = f'{self.gee_dir}/{self.name}_{fid:04}'
+                assetId = f'{self.gee_dir}/{self.name}_{fid:04}'
 
-            # Créer la tache d'export
-            task = ee.batch.Export.table.toAsset(
-                collection=fc,
-                description=f'upload {self.asset_uuid} fid {fid:04}',
-                assetId=assetId
-            )
-            task.start()
+                # Créer la tache d'export
+                tasks.append(backend.getBackend().export_table(
+                    collection=fc,
+                    description=f'upload {self.asset_uuid} fid {fid:04}',
+                    asset_id=assetId
+                ))
 
-            if not silent:
-                print(f'\rUpload zone {fid:04} started', end=" ")
-            
-        self.update_gee_state()
+        # Démarrer les taches en parallèle
+        self.start_tasks(tasks, max_workers=max_workers, silent=silent)
         
 
 class MetricsDataset(GlourbEEDataset):
@@ -272,14 +522,59 @@ class MetricsDataset(GlourbEEDataset):
             super().__init__(ee_project_name, asset_uuid)
 
         self.len = self.parent_zones.len
+        self.packs = self.parent_zones.packs
+        self.windows = self.config['features'][0]['properties'].get('windows') or 1 if self.config else 1
 
-        self.name = f'{self.parent_zones.name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        # Répartition des zones dans les taches d'export, pour les calculs ordonnancés (voir workflow.scheduleZones)
+        schedule = self.config['features'][0]['properties'].get('schedule') if self.config else None
+        self.schedule = {int(task): fids for task, fids in json.loads(schedule).items()} if schedule else None
+
+        # Le nom des assets est fixé au premier calcul : le relire dans la config d'un calcul existant
+        if self.config:
+            self.name = self.config['features'][0]['properties']['name']
+        else:
+            self.name = f'{self.parent_zones.name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
 
         self.gee_dir = f'{self.parent_zones.gee_dir}/{self.asset_uuid}'
         self.update_gee_state()
 
+    @property
+    def n_assets(self):
+        """
+        Number of table assets expected in a complete dataset (one per zone, pack or scheduled task, and per time window).
+        """
+        return (len(self.schedule) if self.schedule else super().n_assets) * self.windows
+
+    def counted_assets(self, assets: list):
+        """
+        Table assets counted to check if the dataset is complete: the assets added by append_new_acquisitions are left out.
+
+        Args:
+            assets (list): Table assets, as returned by ee.data.listAssets().
+        """
+        return [asset for asset in assets if not self.is_appended(asset)]
+
+    @staticmethod
+    def is_appended(asset: dict):
+        """
+        Check if a table asset was added by append_new_acquisitions.
+
+        Args:
+            asset (dict): Table asset, as returned by ee.data.listAssets().
+        """
+        return re.search(r'_a\d{8}T\d{6}$', asset['name']) is not None
 
-    def compute_zone_metrics(self, fid: int, metrics: ee.FeatureCollection, params: dict, silent: bool = False):
+    @staticmethod
+    def window_suffix(window: int = None):
+        """
+        Suffix added to the asset name and task description of a time window.
+
+        Args:
+            window (int, optional): Time window number. Defaults to None (no time windows).
+        """
+        return '' if window is None else f'_w{window:02}'
+
+    def compute_zone_metrics(self, fid: int, metrics: ee.FeatureCollection, params: dict, silent: bool = False, start: bool = True, window: int = None):
         """
         Compute the metrics for a zone and upload them to Earth Engine.
 
@@ -287,11 +582,96 @@ class MetricsDataset(GlourbEEDataset):
             fid (int): Feature ID of the zone.
             metrics (ee.FeatureCollection): Metrics to upload.
             silent (bool, optional): If True, do not print progress. Defaults to False.
+            start (bool, optional): If False, return the export task without starting it (see start_tasks). Defaults to True.
+            window (int, optional): Time window number, for workflows split in time windows. Defaults to None.
+        """
+        task = self.export_metrics(metrics=metrics,
+                                   suffix=f'{int(fid):04}{self.window_suffix(window)}',
+                                   label=f'fid {int(fid):04}{self.window_suffix(window)}',
+                                   params=params)
+
+        if not start:
+            return task
+
+        task.start()
+        self.track_task(task)
+
+        if not silent:
+            print(f'\rCompute metrics for zone {int(fid):04} started', end=" ")
+
+        return task
+
+    def compute_pack_metrics(self, pack: int, metrics: ee.FeatureCollection, params: dict, silent: bool = False, start: bool = True, window: int = None):
+        """
+        Compute the metrics for a pack of zones and upload them to Earth Engine.
+
+        Args:
+            pack (int): Pack number in the parent extraction zones dataset.
+            metrics (ee.FeatureCollection): Metrics to upload.
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+            start (bool, optional): If False, return the export task without starting it (see start_tasks). Defaults to True.
+            window (int, optional): Time window number, for workflows split in time windows. Defaults to None.
+        """
+        task = self.export_metrics(metrics=metrics,
+                                   suffix=f'pack{pack:04}{self.window_suffix(window)}',
+                                   label=f'pack {pack:04}{self.window_suffix(window)}',
+                                   params=params)
+
+        if not start:
+            return task
+
+        task.start()
+        self.track_task(task)
+
+        if not silent:
+            print(f'\rCompute metrics for pack {pack+1}/{self.packs} started', end=" ")
+
+        return task
+
+    def compute_task_metrics(self, task_number: int, metrics: ee.FeatureCollection, params: dict, silent: bool = False, start: bool = True, window: int = None):
+        """
+        Compute the metrics for a scheduled task (a group of zones, see workflow.scheduleZones) and upload them to Earth Engine.
+
+        Args:
+            task_number (int): Task number in the schedule.
+            metrics (ee.FeatureCollection): Metrics to upload.
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+            start (bool, optional): If False, return the export task without starting it (see start_tasks). Defaults to True.
+            window (int, optional): Time window number, for workflows split in time windows. Defaults to None.
+        """
+        task = self.export_metrics(metrics=metrics,
+                                   suffix=f'task{task_number:04}{self.window_suffix(window)}',
+                                   label=f'task {task_number:04}{self.window_suffix(window)}',
+                                   params=params)
+
+        if not start:
+            return task
+
+        task.start()
+        self.track_task(task)
+
+        if not silent:
+            print(f'\rCompute metrics for task {task_number+1}/{len(self.schedule)} started', end=" ")
+
+        return task
+
+    def export_metrics(self, metrics: ee.FeatureCollection, suffix: str, label: str, params: dict):
+        """
+        Create the export task of a metrics table. The dataset config is exported first if not already done.
+
+        Args:
+            metrics (ee.FeatureCollection): Metrics to upload.
+            suffix (str): Suffix of the output asset name.
+            label (str): Label added to the task description.
+            params (dict): Workflow parameters stored in the config.
+
+        Returns:
+            ee.batch.Task: The metrics export task, not started.
         """
 
         # Create config if not exists
         if not self.config:
-            self.config = self.parent_zones.config
+            self.config = copy.deepcopy(self.parent_zones.config)
             self.config['columns'].update({
                 'satellite_type': 'String',
                 'start': 'String',
@@ -302,6 +682,11 @@ class MetricsDataset(GlourbEEDataset):
                 'watermask_expression': 'String',
                 'activechannel_expression': 'String',
                 'vegetation_expression': 'String',
+                'time_window': 'Integer',
+                'windows': 'Integer',
+                'schedule': 'String',
+                'engine': 'String',
+                'morphology': 'String',
                 'parent_uuid': 'String',
                })
             self.config['features'][0]['properties'].update({
@@ -315,83 +700,185 @@ class MetricsDataset(GlourbEEDataset):
                 'watermask_expression': params['watermask_expression'],
                 'activechannel_expression': params['activechannel_expression'],
                 'vegetation_expression': params['vegetation_expression'],
+                'time_window': params.get('time_window') or 0,
+                'windows': self.windows,
+                'schedule': json.dumps(self.schedule) if self.schedule else '',
+                'engine': params.get('engine') or 'zones',
+                'morphology': params.get('morphology') or 'vectors',
                 'parent_uuid': self.parent_zones.asset_uuid,
             })
+            self.export_config()
 
-            task = ee.batch.Export.table.toAsset(
-                collection=ee.FeatureCollection(self.config),
-                description=f'compute {self.asset_uuid} config',
-                assetId=f'{self.gee_dir}/config'
-            )
-            task.start()
-
-        assetId = f'{self.gee_dir}/{self.name}_{fid:04}'
+        assetId = f'{self.gee_dir}/{self.name}_{suffix}'
 
         # Créer la tache d'export
-        task = ee.batch.Export.table.toAsset(
+        task = backend.getBackend().export_table(
             collection=metrics,
-            description=f'compute {self.asset_uuid} fid {fid:04}',
-            assetId=assetId
+            description=f'compute {self.asset_uuid} {label}',
+            asset_id=assetId
+        )
+
+        return task
+
+
+    def export_config(self):
+        """
+        Export the config of the dataset (already built by export_metrics) to its config table, and start the task.
+
+        Returns:
+            ee.batch.Task: The started config export task.
+        """
+        task = backend.getBackend().export_table(
+            collection=self.config,
+            description=f'compute {self.asset_uuid} config',
+            asset_id=f'{self.gee_dir}/config'
         )
         task.start()
+        self.track_task(task)
+        collection.invalidateCatalog(self.ee_project_name, self.parent_zones.asset_uuid)
 
-        if not silent:
-            print(f'\rCompute metrics for zone {fid:04} started', end=" ")
+        return task
 
-        self.update_gee_state()
+    def latest_dates(self):
+        """
+        Get the date of the latest metrics computed for each zone, with one single getInfo request.
 
+        Returns:
+            dict: Latest image date of each zone (Feature ID -> milliseconds since epoch). Zones without any metrics are missing.
+        """
+        fid_field = self.parent_zones.fid_field
+        metrics = ee.FeatureCollection([ee.FeatureCollection(asset['name']) for asset in self.gee_assets]).flatten()
+        metrics = metrics.map(lambda feature: feature.set('DATE_MILLIS', ee.Date(feature.get('DATE')).millis()))
+
+        latest = backend.getBackend().get_info(metrics.reduceColumns(ee.Reducer.max().group(groupField=1, groupName='FID'), ['DATE_MILLIS', fid_field]))
+
+        return {int(group['FID']): group['max'] for group in latest['groups']}
 
-    def download(self, output_file: str = './example_data/output.csv', overwrite: bool = False, silent: bool = False):
+    @instrumentation.phase('append')
+    def append_new_acquisitions(self, end: str = None, max_workers: int = 8, silent: bool = False):
+        """
+        Compute the metrics of the images acquired after the latest metrics of each zone, and add them to the dataset.
+
+        The images are processed with the parameters stored in the dataset config. The new metrics are exported as
+        additional assets (suffixed with the append time), which are merged with the others by download().
+
+        Args:
+            end (str, optional): End date for image collection, formatted as 'YYYY-MM-DD'. Defaults to the end date stored in the config.
+            max_workers (int, optional): Maximum number of computation tasks started concurrently. Defaults to 8.
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+
+        Returns:
+            list: The started export tasks.
+        """
+        # Import local : workflow importe ce module
+        from glourbee import workflow
+
+        assert self.config, 'Metrics dataset has no config. Please start a workflow before appending new acquisitions.'
+        assert self.gee_state == 'complete', 'Metrics dataset is not complete. Please wait for the running tasks or resume the workflow before appending new acquisitions.'
+
+        properties = self.config['features'][0]['properties']
+
+        # DATE est un jour (minuit UTC) : ne garder que les images acquises à partir du lendemain du dernier jour calculé,
+        # sinon les scènes du dernier jour (acquises après minuit) seraient calculées à nouveau
+        day = 24 * 3600 * 1000
+        next_days = {fid: millis + day for fid, millis in self.latest_dates().items()}
+
+        # Les zones sans métriques repartent de la date de début du calcul initial
+        default_since = ee.Date(properties['start']).millis().subtract(1)
+        since = ee.Dictionary({str(fid): millis - 1 for fid, millis in next_days.items()})
+        first_date = pd.Timestamp(min(next_days.values()), unit='ms').strftime('%Y-%m-%d') if len(next_days) == self.len else properties['start']
+
+        collection = workflow.buildCollection(satellite_type=properties['satellite_type'],
+                                              start=first_date,
+                                              end=end or properties['end'],
+                                              cloud_filter=properties['cloud_filter'],
+                                              cloud_masking=properties['cloud_masking'],
+                                              mosaic_same_day=properties['mosaic_same_day'],
+                                              watermask_expression=properties['watermask_expression'],
+                                              activechannel_expression=properties['activechannel_expression'],
+                                              vegetation_expression=properties['vegetation_expression'],
+                                              roi=self.parent_zones.bounds())
+
+        fid_field = self.parent_zones.fid_field
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+
+        tasks = []
+        for asset in self.parent_zones.gee_assets:
+            zones = ee.FeatureCollection(asset['name']).map(
+                lambda zone: zone.set('SINCE', since.get(ee.Number(zone.get(fid_field)).format('%d'), default_since)))
+
+            metrics = zones_metrics.calculateZONEsMetrics(collection=collection,
+                                                          zones=zones,
+                                                          scale=workflow.SCALES[properties['satellite_type']],
+                                                          since_field='SINCE',
+                                                          engine=properties.get('engine') or 'zones',
+                                                          morphology=properties.get('morphology') or 'vectors')
+
+            # Même suffixe que les assets du calcul initial (zone ou pack), suivi de la date de l'ajout
+            suffix = asset['name'].split(f'{self.parent_zones.name}_')[-1]
+            tasks.append(self.export_metrics(metrics=metrics,
+                                             suffix=f'{suffix}_a{stamp}',
+                                             label=f'{suffix} append {stamp}',
+                                             params=properties))
+
+        self.start_tasks(tasks, max_workers=max_workers, silent=silent)
+
+        return tasks
+
+    @instrumentation.phase('download')
+    def download(self, output_file: str = './example_data/output.csv', overwrite: bool = False, silent: bool = False, max_workers: int = 8, progress=None, partition_by: str = None, cache_dir: str = None):
         """
         Download the assets from Earth Engine.
 
+        Downloaded assets are kept in a local cache: only the assets new or updated since the previous download are fetched.
+
         Args:
-            output_file (str): Path to the output file.
+            output_file (str): Path to the output file (.csv, .parquet, .feather or .arrow).
+            overwrite (bool, optional): If True, ignore the local cache and download all the assets again. Defaults to False.
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+            max_workers (int, optional): Maximum number of concurrent downloads. Defaults to 8.
+            progress (callable, optional): Called as progress(done, total, asset_name) after each downloaded asset. Defaults to None.
+            partition_by (str, optional): 'fid' or 'year' to write a partitioned Parquet dataset in the output_file directory, replacing its previous content. Defaults to None.
+            cache_dir (str, optional): Root directory of the download cache. Defaults to ~/.cache/glourbee.
         """
 
         self.update_gee_state()
 
         output_ext = os.path.splitext(output_file)[1]
-        assert output_ext in ['.csv'], 'Output file should be a .csv file.'
+        assert output_ext in ['.csv', '.parquet', '.feather', '.arrow'], 'Output file should be a .csv, .parquet, .feather or .arrow file.'
 
         assert len(self.gee_assets) > 0, 'No assets to download.'
 
-        tempdir = tempfile.TemporaryDirectory()
-        for i, assetData in enumerate(self.gee_assets):
-            temp_file = os.path.join(
-                tempdir.name, f'{os.path.basename(assetData["name"])}.csv')
-
-            if os.path.exists(temp_file) and not overwrite:
-                continue
-            else:
-                asset = ee.FeatureCollection(assetData['name'])
-
-                if not silent:
-                    print(
-                        f'\rDownloading {os.path.basename(assetData["name"])} ({i+1}/{len(self.gee_assets)})', end=" ")
-
-                # Télécharger l'asset
-                urlretrieve(asset.getDownloadUrl(), temp_file)
-
-                # Toilettage pour compatilité avec riviewlet (https://github.com/lvaudor/riviewlet)
-                df = pd.read_csv(temp_file, index_col=None, header=0)
-                df['ID'] = df[self.parent_zones.fid_field]
-                df['geometry'] = df.apply(lambda row: shape(json.loads(row['.geo'])).centroid, axis=1)
-                df = df.drop(['system:index', '.geo'], axis=1)
-                df.to_csv(temp_file)
-
-        # Concaténer les fichiers temporaires
+        def report(done, total, asset_name):
+            if not silent:
+                print(f'\rDownloading {os.path.basename(asset_name)} ({done}/{total})', end=" ")
+            if progress:
+                progress(done, total, asset_name)
+
+        cache = download_management.DownloadCache(
+            os.path.join(cache_dir or download_management.CACHE_DIR, self.asset_uuid))
+
+        # Télécharger les assets nouveaux ou modifiés en parallèle, et les nettoyer au fil de l'eau
+        output_dfs = download_management.downloadTables(
+            self.gee_assets,
+            process=lambda df: download_management.cleanMetrics(df, self.parent_zones.fid_field),
+            max_workers=max_workers,
+            progress=report,
+            cache=cache,
+            overwrite=overwrite)
+        cache.prune(self.gee_assets)
+
+        # Concaténer les tables téléchargées
         if not silent:
             print(f'\rConcatenating downloaded files', end=" ")
 
-        output_dfs = []
-        for filename in os.listdir(tempdir.name):
-            df = pd.read_csv(os.path.join(
-                tempdir.name, filename), index_col=None, header=0)
-            output_dfs.append(df)
-
         df = pd.concat(output_dfs, axis=0, ignore_index=True)
-        df.to_csv(output_file)
+
+        # Remettre dans l'ordre les mesures des différentes fenêtres temporelles ou des ajouts d'une même zone
+        if self.windows > 1 or len(self.counted_assets(self.gee_assets)) < len(self.gee_assets):
+            df = df.sort_values([self.parent_zones.fid_field, 'DATE'], ignore_index=True)
+
+        download_management.writeMetrics(df, output_file, self.parent_zones.fid_field, partition_by=partition_by)
 
 def uploadDGOs(dgo_shapefile_path, simplify_tolerance=15, ee_project_name='ee-glourb'):
     raise DeprecationWarning('This function is deprecated. Use ExtractionZones.upload_to_gee() method instead.')
@@ -0,0 +1,480 @@
+import ee
+import os
+import abc
+import csv
+import json
+import time
+import uuid
+import random
+import tempfile
+import threading
+
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class Backend(abc.ABC):
+    """
+    Interface of the Earth Engine requests made by the dataset and workflow code.
+
+    Assets and operations are plain dicts shaped like the Earth Engine API responses (see ee.data.listAssets() and
+    ee.data.listOperations()). Tables are GeoJSON FeatureCollection dicts.
+
+    Every method is abstract: a backend which does not implement all of them cannot be instantiated.
+    """
+
+    @abc.abstractmethod
+    def list_assets(self, parent: str):
+        """
+        List the children of a folder.
+
+        Args:
+            parent (str): Asset ID of the folder.
+
+        Returns:
+            list: Assets dicts with 'name', 'id', 'type' and 'updateTime' keys.
+        """
+
+    @abc.abstractmethod
+    def create_folder(self, asset_id: str):
+        """
+        Create a folder.
+
+        Args:
+            asset_id (str): Asset ID of the folder.
+        """
+
+    @abc.abstractmethod
+    def delete_asset(self, asset_id: str):
+        """
+        Delete an asset (a folder must be empty).
+
+        Args:
+            asset_id (str): Asset ID.
+        """
+
+    @abc.abstractmethod
+    def read_table(self, asset_id: str):
+        """
+        Read a whole table asset.
+
+        Args:
+            asset_id (str): Asset ID of the table.
+
+        Returns:
+            dict: The table, as a GeoJSON FeatureCollection.
+        """
+
+    @abc.abstractmethod
+    def first_features(self, asset_ids: list):
+        """
+        Read the properties of the first feature of several tables, with one single request.
+
+        Args:
+            asset_ids (list): Asset IDs of the tables.
+
+        Returns:
+            list: Properties of the first feature of each table, in the asset_ids order.
+        """
+
+    @abc.abstractmethod
+    def get_info(self, obj):
+        """
+        Compute an Earth Engine object and fetch its value.
+
+        Args:
+            obj (ee.ComputedObject): Object to compute.
+
+        Returns:
+            The value of the object, as returned by obj.getInfo().
+        """
+
+    @abc.abstractmethod
+    def export_table(self, collection, description: str, asset_id: str):
+        """
+        Create the export task of a table to an asset.
+
+        Args:
+            collection (dict | ee.FeatureCollection): Table to export, as a GeoJSON FeatureCollection or a computed FeatureCollection.
+            description (str): Task description.
+            asset_id (str): Asset ID of the exported table.
+
+        Returns:
+            The task, not started. It has a start() method and 'id', 'name' and 'config' attributes like ee.batch.Task.
+        """
+
+    @abc.abstractmethod
+    def list_operations(self):
+        """
+        List all the operations of the project.
+
+        Returns:
+            list: Operations dicts with 'name', 'metadata' and 'done' keys.
+        """
+
+    @abc.abstractmethod
+    def get_operation(self, name: str):
+        """
+        Get the state of an operation.
+
+        Args:
+            name (str): Operation name.
+        """
+
+    @abc.abstractmethod
+    def cancel_operation(self, name: str):
+        """
+        Cancel an operation.
+
+        Args:
+            name (str): Operation name.
+        """
+
+    @abc.abstractmethod
+    def download_url(self, asset_id: str):
+        """
+        Get an URL to download a table asset as CSV.
+
+        Args:
+            asset_id (str): Asset ID of the table.
+        """
+
+
+class EarthEngineBackend(Backend):
+    """
+    Backend sending the requests to Earth Engine. The ee module should be initialized.
+    """
+
+    def list_assets(self, parent: str):
+        return ee.data.listAssets({'parent': parent})['assets']
+
+    def create_folder(self, asset_id: str):
+        ee.data.createAsset({'type': 'Folder'}, asset_id)
+
+    def delete_asset(self, asset_id: str):
+        ee.data.deleteAsset(asset_id)
+
+    def read_table(self, asset_id: str):
+        return ee.FeatureCollection(asset_id).getInfo()
+
+    def first_features(self, asset_ids: list):
+        if not asset_ids:
+            return []
+
+        tables = ee.FeatureCollection([ee.Feature(ee.FeatureCollection(asset_id).first()) for asset_id in asset_ids]).getInfo()
+        return [feature['properties'] for feature in tables['features']]
+
+    def get_info(self, obj):
+        return obj.getInfo()
+
+    def export_table(self, collection, description: str, asset_id: str):
+        if isinstance(collection, dict):
+            collection = ee.FeatureCollection(collection)
+
+        return ee.batch.Export.table.toAsset(collection=collection, description=description, assetId=asset_id)
+
+    def list_operations(self):
+        return ee.data.listOperations()
+
+    def get_operation(self, name: str):
+        return ee.data.getOperation(name)
+
+    def cancel_operation(self, name: str):
+        ee.data.cancelOperation(name)
+
+    def download_url(self, asset_id: str):
+        return ee.FeatureCollection(asset_id).getDownloadUrl()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class FakeTask:
+    """
+    Export task of a FakeBackend, with the same interface as ee.batch.Task.
+    """
+
+    def __init__(self, backend, collection, description: str, asset_id: str):
+        self.backend = backend
+        self.collection = collection
+        self.config = {'description': description, 'assetId': asset_id}
+        self.id = None
+        self.name = None
+
+    def start(self):
+        self.backend._start(self)
+
+
+class FakeBackend(Backend):
+    """
+    In-memory stand-in of Earth Engine, to run and load-test the dataset code offline.
+
+    Every request waits for the configured latency and may fail randomly. Export tasks run in simulated time: an
+    operation stays RUNNING for its duration, then writes its table (or fails). Tables which are not GeoJSON dicts
+    (computed FeatureCollections) are produced by table_factory, and the values of computed objects by info_factory:
+    nothing is sent to Earth Engine.
+    """
+
+    def __init__(self,
+                 ee_project_name: str = 'ee-glourb',
+                 latency: float = 0,
+                 failure_rate: float = 0,
+                 task_duration=0,
+                 task_failure_rate: float = 0,
+                 table_factory=None,
+                 info_factory=None,
+                 seed: int = None):
+        """
+        Initialize the FakeBackend object.
+
+        Args:
+            ee_project_name (str, optional): Earth Engine project name. Its extraction_zones folder is created. Defaults to 'ee-glourb'.
+            latency (float, optional): Duration of each request, in seconds. Defaults to 0.
+            failure_rate (float, optional): Probability of each request to raise an ee.EEException. Defaults to 0.
+            task_duration (float | callable, optional): Duration of the export tasks, in seconds, or function of the task description returning it. Defaults to 0.
+            task_failure_rate (float, optional): Probability of each export task to end FAILED. Defaults to 0.
+            table_factory (callable, optional): Called as table_factory(asset_id, collection) to produce the GeoJSON table of the exports of computed collections. Defaults to None (empty tables).
+            info_factory (callable, optional): Called as info_factory(obj) to produce the value of a computed object in get_info(), e.g. a recorded getInfo() result. Defaults to None (get_info() raises NotImplementedError).
+            seed (int, optional): Seed of the random failures. Defaults to None.
+        """
+        self.ee_project_name = ee_project_name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.task_duration = task_duration
+        self.task_failure_rate = task_failure_rate
+        self.table_factory = table_factory
+        self.info_factory = info_factory
+        self.random = random.Random(seed)
+
+        self.assets = {}
+        self.tables = {}
+        self.operations = {}
+        self.lock = threading.RLock()
+        self.download_dir = tempfile.mkdtemp(prefix='glourbee_fake_')
+
+        for folder in [f'projects/{ee_project_name}/assets', f'projects/{ee_project_name}/assets/extraction_zones']:
+            self._add_asset(folder, 'FOLDER')
+
+    def _request(self, name: str):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+        if failed:
+            raise ee.EEException(f'Injected failure of {name}.')
+
+    def _add_asset(self, asset_id: str, asset_type: str):
+        self.assets[asset_id] = {'name': asset_id, 'id': asset_id, 'type': asset_type, 'updateTime': _now()}
+
+    def _check_exists(self, asset_id: str):
+        if asset_id not in self.assets:
+            raise ee.EEException(f'Asset "{asset_id}" not found.')
+
+    def add_table(self, asset_id: str, table: dict):
+        """
+        Create a table asset directly, without export task (to set up tests).
+
+        Args:
+            asset_id (str): Asset ID of the table. Its parent folder should exist.
+            table (dict): Table, as a GeoJSON FeatureCollection.
+        """
+        with self.lock:
+            self._check_exists(os.path.dirname(asset_id))
+            self._add_asset(asset_id, 'TABLE')
+            self.tables[asset_id] = table
+
+    def list_assets(self, parent: str):
+        self._request('list_assets')
+        with self.lock:
+            self._check_exists(parent)
+            return [dict(asset) for name, asset in sorted(self.assets.items()) if os.path.dirname(name) == parent]
+
+    def create_folder(self, asset_id: str):
+        self._request('create_folder')
+        with self.lock:
+            self._check_exists(os.path.dirname(asset_id))
+            if asset_id in self.assets:
+                raise ee.EEException(f'Cannot overwrite asset "{asset_id}".')
+            self._add_asset(asset_id, 'FOLDER')
+
+    def delete_asset(self, asset_id: str):
+        self._request('delete_asset')
+        with self.lock:
+            self._check_exists(asset_id)
+            if any(os.path.dirname(name) == asset_id for name in self.assets):
+                raise ee.EEException(f'Folder "{asset_id}" is not empty.')
+            del self.assets[asset_id]
+            self.tables.pop(asset_id, None)
+
+    def read_table(self, asset_id: str):
+        self._request('read_table')
+        with self.lock:
+            if asset_id not in self.tables:
+                raise ee.EEException(f'Collection asset "{asset_id}" not found.')
+            return json.loads(json.dumps(self.tables[asset_id]))
+
+    def first_features(self, asset_ids: list):
+        self._request('first_features')
+        with self.lock:
+            missing = [asset_id for asset_id in asset_ids if asset_id not in self.tables]
+            if missing:
+                raise ee.EEException(f'Collection asset "{missing[0]}" not found.')
+            return [dict(self.tables[asset_id]['features'][0]['properties']) for asset_id in asset_ids]
+
+    def get_info(self, obj):
+        self._request('get_info')
+
+        # Pas de moteur de calcul ici, et aucune requête vers Earth Engine : la valeur vient de info_factory
+        if not self.info_factory:
+            raise NotImplementedError('FakeBackend does not compute Earth Engine objects: set its info_factory to return their values.')
+
+        return json.loads(json.dumps(self.info_factory(obj)))
+
+    def export_table(self, collection, description: str, asset_id: str):
+        return FakeTask(self, collection, description, asset_id)
+
+    def _start(self, task: FakeTask):
+        self._request('start')
+
+        duration = self.task_duration(task.config['description']) if callable(self.task_duration) else self.task_duration
+        operation_id = uuid.uuid4().hex.upper()
+
+        with self.lock:
+            task.id = operation_id
+            task.name = f'projects/{self.ee_project_name}/operations/{operation_id}'
+            self.operations[task.name] = {
+                'operation': {
+                    'name': task.name,
+                    'metadata': {
+                        'type': 'EXPORT_FEATURES',
+                        'description': task.config['description'],
+                        'state': 'RUNNING',
+                        'createTime': _now(),
+                        'startTime': _now(),
+                        'updateTime': _now(),
+                    },
+                    'done': False,
+                },
+                'task': task,
+                'due': time.monotonic() + duration,
+            }
+
+    def _advance(self):
+        """
+        Finish the operations whose duration is over.
+        """
+        now = time.monotonic()
+        for entry in self.operations.values():
+            op = entry['operation']
+            if op['done'] or now < entry['due']:
+                continue
+
+            task = entry['task']
+            asset_id = task.config['assetId']
+            op['done'] = True
+            op['metadata']['endTime'] = op['metadata']['updateTime'] = _now()
+
+            if self.random.random() < self.task_failure_rate:
+                op['metadata']['state'] = 'FAILED'
+                op['error'] = {'message': 'Injected task failure.'}
+            elif asset_id in self.assets or os.path.dirname(asset_id) not in self.assets:
+                op['metadata']['state'] = 'FAILED'
+                op['error'] = {'message': f'Cannot export to "{asset_id}".'}
+            else:
+                if isinstance(task.collection, dict):
+                    table = task.collection
+                elif self.table_factory:
+                    table = self.table_factory(asset_id, task.collection)
+                else:
+                    table = {'type': 'FeatureCollection', 'features': []}
+
+                self._add_asset(asset_id, 'TABLE')
+                self.tables[asset_id] = json.loads(json.dumps(table))
+                op['metadata']['state'] = 'SUCCEEDED'
+
+    def list_operations(self):
+        self._request('list_operations')
+        with self.lock:
+            self._advance()
+            return [json.loads(json.dumps(entry['operation'])) for entry in self.operations.values()]
+
+    def get_operation(self, name: str):
+        self._request('get_operation')
+        with self.lock:
+            self._advance()
+            if name not in self.operations:
+                raise ee.EEException(f'Operation "{name}" not found.')
+            return json.loads(json.dumps(self.operations[name]['operation']))
+
+    def cancel_operation(self, name: str):
+        self._request('cancel_operation')
+        with self.lock:
+            self._advance()
+            op = self.operations[name]['operation']
+            if not op['done']:
+                op['done'] = True
+                op['metadata']['state'] = 'CANCELLED'
+                op['metadata']['endTime'] = op['metadata']['updateTime'] = _now()
+
+    def download_url(self, asset_id: str):
+        self._request('download_url')
+        with self.lock:
+            if asset_id not in self.tables:
+                raise ee.EEException(f'Collection asset "{asset_id}" not found.')
+            table = self.tables[asset_id]
+
+        # Même format que les CSV de Earth Engine : system:index, les propriétés puis .geo
+        columns = []
+        for feature in table['features']:
+            columns += [key for key in feature['properties'] if key not in columns]
+
+        path = os.path.join(self.download_dir, f'{uuid.uuid4().hex}.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['system:index'] + columns + ['.geo'])
+            for i, feature in enumerate(table['features']):
+                writer.writerow([feature.get('id', i)] +
+                                [feature['properties'].get(col) for col in columns] +
+                                [json.dumps(feature['geometry']) if feature.get('geometry') else ''])
+
+        return Path(path).as_uri()
+
+
+_backend = EarthEngineBackend()
+
+
+def getBackend():
+    """
+    Get the backend used by the dataset and workflow code.
+    """
+    return _backend
+
+
+def setBackend(backend: Backend):
+    """
+    Set the backend used by the dataset and workflow code.
+
+    Args:
+        backend (Backend): The new backend, e.g. a FakeBackend to work offline.
+    """
+    global _backend
+    _backend = backend
+
+
+@contextmanager
+def useBackend(backend: Backend):
+    """
+    Use a backend in a with block, then restore the previous one.
+
+    Args:
+        backend (Backend): The backend to use in the block.
+    """
+    previous = getBackend()
+    setBackend(backend)
+    try:
+        yield backend
+    finally:
+        setBackend(previous)
@@ -1,51 +1,192 @@
 import ee
+import os
+import json
+import time
 import pandas as pd
 
-def getGlourbeeExtractionZones(ee_project_name: str='ee-glourb'):
+from glourbee import (
+    backend,
+    instrumentation,
+    task_management,
+    download_management
+)
 
-    extraction_zones = []
+CATALOG_DIR = os.path.join(download_management.CACHE_DIR, 'catalog')
 
-    root_dir = f'projects/{ee_project_name}/assets/extraction_zones'
-    root_content = ee.data.listAssets({'parent': root_dir})
-    root_names = [asset['name'] for asset in root_content['assets']]
 
-    for asset in root_names:
-        asset_content = ee.data.listAssets({'parent': asset})
-        asset_names = [asset['name'] for asset in asset_content['assets']]
+def _catalogFile(ee_project_name: str, key: str):
+    return os.path.join(CATALOG_DIR, ee_project_name, f'{key}.json')
 
-        if not f'{asset}/config' in asset_names:
-            continue
 
-        config = ee.FeatureCollection(f'{asset}/config').getInfo()['features'][0]['properties']
+def _readCatalog(ee_project_name: str, key: str, ttl: int):
+    path = _catalogFile(ee_project_name, key)
 
-        metrics_names = [asset['name'] for asset in asset_content['assets'] if asset['type'] == 'FOLDER']
-        config['metrics_ds'] = len(metrics_names)
-        config['asset_uuid'] = asset.split('/')[-1]
+    if not os.path.exists(path) or time.time() - os.path.getmtime(path) > ttl:
+        return None
 
-        extraction_zones.append(config)
+    with open(path) as f:
+        return json.load(f)
+
+
+def _writeCatalog(ee_project_name: str, key: str, records: list):
+    path = _catalogFile(ee_project_name, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(records, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def invalidateCatalog(ee_project_name: str = 'ee-glourb', zones_uuid: str = None):
+    """
+    Remove the cached catalog after datasets are created or deleted.
+
+    Args:
+        ee_project_name (str, optional): Earth Engine project name. Defaults to 'ee-glourb'.
+        zones_uuid (str, optional): If set, only invalidate the extraction zones listing and the metrics listing of these extraction zones. Defaults to None (all the project catalog).
+    """
+    catalog_dir = os.path.join(CATALOG_DIR, ee_project_name)
+    if not os.path.isdir(catalog_dir):
+        return
+
+    for filename in os.listdir(catalog_dir):
+        key = filename.split('.')[0]
+        if not zones_uuid or key.startswith('zones') or key == f'metrics_{zones_uuid}':
+            os.remove(os.path.join(catalog_dir, filename))
+
+
+def _fetchConfigs(folders: list):
+    """
+    Fetch the config of several datasets with one single getInfo request.
+
+    Args:
+        folders (list): Asset IDs of the datasets folders. They should all contain a config table.
+
+    Returns:
+        list: Config properties of each dataset, with its asset_uuid, in the folders order.
+    """
+    configs = backend.getBackend().first_features([f'{folder}/config' for folder in folders])
+
+    for config, folder in zip(configs, folders):
+        config['asset_uuid'] = folder.split('/')[-1]
+
+    return configs
+
+
+def _listChildren(folders: list, max_workers: int = 8):
+    """
+    List the content of several folders concurrently.
+
+    Returns:
+        list: Assets of each folder, in the folders order.
+    """
+    outcomes = task_management.runConcurrently(backend.getBackend().list_assets,
+                                               folders,
+                                               max_workers=max_workers)
+    for o in outcomes:
+        if o['error']:
+            raise o['error']
+
+    return [o['result'] for o in outcomes]
+
+
+def _withConfig(folders: list, contents: list):
+    """
+    Keep the folders which contain a config table.
+    """
+    return [folder for folder, content in zip(folders, contents) if f'{folder}/config' in [asset['name'] for asset in content]]
+
+
+@instrumentation.phase('catalog')
+def getGlourbeeExtractionZones(ee_project_name: str='ee-glourb', metrics_count: bool = False, ttl: int = 3600, refresh: bool = False):
+    """
+    List the extraction zones datasets of the project.
+
+    The configs are fetched with one batched request and the result is cached locally for ttl seconds, unless a dataset
+    was left out because its config is not exported yet.
+
+    Args:
+        ee_project_name (str, optional): Earth Engine project name. Defaults to 'ee-glourb'.
+        metrics_count (bool, optional): If True, count the metrics datasets of each extraction zones dataset (one concurrent listing per dataset). If False, the counts are only taken from the cached metrics listings (None when a dataset has not been listed by getGlourbeeMetrics). Defaults to False.
+        ttl (int, optional): Lifetime of the local cache, in seconds. Defaults to 3600.
+        refresh (bool, optional): If True, ignore the local cache. Defaults to False.
+    """
+
+    key = 'zones' if metrics_count else 'zones_nocount'
+    extraction_zones = None if refresh else _readCatalog(ee_project_name, key, ttl)
+
+    if extraction_zones is None:
+        root_dir = f'projects/{ee_project_name}/assets/extraction_zones'
+        root_content = backend.getBackend().list_assets(root_dir)
+        root_names = [asset['name'] for asset in root_content]
+
+        if metrics_count:
+            # Les listings servent aussi à écarter les dossiers sans config (upload en cours)
+            contents = _listChildren(root_names)
+            folders = _withConfig(root_names, contents)
+            counts = {name: len([a for a in content if a['type'] == 'FOLDER']) for name, content in zip(root_names, contents)}
+
+            extraction_zones = _fetchConfigs(folders)
+            for config, folder in zip(extraction_zones, folders):
+                config['metrics_ds'] = counts[folder]
+        else:
+            try:
+                folders = root_names
+                extraction_zones = _fetchConfigs(folders)
+            except ee.EEException:
+                # Au moins un dossier n'a pas encore de config : vérifier dossier par dossier
+                contents = _listChildren(root_names)
+                folders = _withConfig(root_names, contents)
+                extraction_zones = _fetchConfigs(folders)
+
+        # Un upload est en cours : ne pas garder en cache une liste où il manque ce jeu de données
+        if len(folders) == len(root_names):
+            _writeCatalog(ee_project_name, key, extraction_zones)
+
+    if not metrics_count:
+        # Pas de listing par jeu de données : compter seulement les calculs déjà en cache
+        for config in extraction_zones:
+            metrics_ds = _readCatalog(ee_project_name, f'metrics_{config["asset_uuid"]}', ttl)
+            config['metrics_ds'] = len(metrics_ds) if metrics_ds is not None else None
 
     return pd.DataFrame(extraction_zones)
 
 
-def getGlourbeeMetrics(ee_project_name: str='ee-glourb', zones_uuid: str=None):
-    assert zones_uuid, 'Please provide an extraction zones uuid'
+@instrumentation.phase('catalog')
+def getGlourbeeMetrics(ee_project_name: str='ee-glourb', zones_uuid: str=None, ttl: int = 3600, refresh: bool = False):
+    """
+    List the metrics datasets of an extraction zones dataset.
 
-    metrics_ds = []
+    The configs are fetched with one batched request and the result is cached locally for ttl seconds, unless a dataset
+    was left out because its config is not exported yet.
 
-    root_dir = f'projects/{ee_project_name}/assets/extraction_zones/{zones_uuid}'
-    root_content = ee.data.listAssets({'parent': root_dir})
-    metrics_names = [asset['name'] for asset in root_content['assets'] if asset['type'] == 'FOLDER']
+    Args:
+        ee_project_name (str, optional): Earth Engine project name. Defaults to 'ee-glourb'.
+        zones_uuid (str): UUID of the extraction zones dataset.
+        ttl (int, optional): Lifetime of the local cache, in seconds. Defaults to 3600.
+        refresh (bool, optional): If True, ignore the local cache. Defaults to False.
+    """
+    assert zones_uuid, 'Please provide an extraction zones uuid'
 
-    for asset in metrics_names:
-        asset_content = ee.data.listAssets({'parent': asset})
-        asset_names = [asset['name'] for asset in asset_content['assets']]
+    key = f'metrics_{zones_uuid}'
+    metrics_ds = None if refresh else _readCatalog(ee_project_name, key, ttl)
 
-        if not f'{asset}/config' in asset_names:
-            continue
+    if metrics_ds is None:
+        root_dir = f'projects/{ee_project_name}/assets/extraction_zones/{zones_uuid}'
+        root_content = backend.getBackend().list_assets(root_dir)
+        metrics_names = [asset['name'] for asset in root_content if asset['type'] == 'FOLDER']
 
-        config = ee.FeatureCollection(f'{asset}/config').getInfo()['features'][0]['properties']
-        config['asset_uuid'] = asset.split('/')[-1]
+        try:
+            folders = metrics_names
+            metrics_ds = _fetchConfigs(folders)
+        except ee.EEException:
+            # Au moins un calcul n'a pas encore de config : vérifier dossier par dossier
+            contents = _listChildren(metrics_names)
+            folders = _withConfig(metrics_names, contents)
+            metrics_ds = _fetchConfigs(folders)
 
-        metrics_ds.append(config)
+        # Un calcul est en cours : ne pas garder en cache une liste où il manque ce jeu de données
+        if len(folders) == len(metrics_names):
+            _writeCatalog(ee_project_name, key, metrics_ds)
 
-    return pd.DataFrame(metrics_ds)
\ No newline at end of file
+    return pd.DataFrame(metrics_ds)
@@ -0,0 +1,283 @@
+import os
+import json
+import shutil
+import shapely
+import threading
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+from urllib.request import urlopen
+
+from glourbee import (
+    backend,
+    task_management
+)
+
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'glourbee')
+
+
+class DownloadCache:
+    """
+    Persistent local cache of downloaded tables.
+
+    The manifest is an append-only JSON lines file keyed by asset name and updateTime: each downloaded table is
+    committed as soon as it is written, so an interrupted download resumes where it stopped.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the DownloadCache object.
+
+        Args:
+            cache_dir (str): Directory of the cache (one per dataset).
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.manifest_file = os.path.join(self.cache_dir, 'manifest.jsonl')
+        self.manifest = {}
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Ligne tronquée par une interruption
+                        continue
+                    self.manifest[entry['name']] = entry
+
+    def file(self, asset_name: str):
+        """
+        Path of the cached table of an asset.
+
+        Args:
+            asset_name (str): Asset ID of the table.
+        """
+        return os.path.join(self.cache_dir, f'{os.path.basename(asset_name)}.pkl')
+
+    def is_fresh(self, asset: dict):
+        """
+        Check if an asset is cached and unchanged since it was downloaded.
+
+        Args:
+            asset (dict): Asset, as returned by ee.data.listAssets().
+        """
+        entry = self.manifest.get(asset['name'])
+        return entry is not None and entry['updateTime'] == asset.get('updateTime') and os.path.exists(self.file(asset['name']))
+
+    def read(self, asset: dict):
+        """
+        Read the cached table of an asset.
+
+        Args:
+            asset (dict): Asset, as returned by ee.data.listAssets().
+        """
+        return pd.read_pickle(self.file(asset['name']))
+
+    def write(self, asset: dict, df: pd.DataFrame):
+        """
+        Store the table of an asset and commit it to the manifest.
+
+        Args:
+            asset (dict): Asset, as returned by ee.data.listAssets().
+            df (pd.DataFrame): Downloaded table.
+        """
+        path = self.file(asset['name'])
+        df.to_pickle(f'{path}.tmp')
+        os.replace(f'{path}.tmp', path)
+
+        entry = {'name': asset['name'], 'updateTime': asset.get('updateTime')}
+        with self.lock:
+            with open(self.manifest_file, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self.manifest[asset['name']] = entry
+
+    def prune(self, assets: list):
+        """
+        Remove the cached tables of assets which are not in the dataset anymore, and compact the manifest.
+
+        Args:
+            assets (list): Current assets of the dataset, as returned by ee.data.listAssets().
+        """
+        names = [asset['name'] for asset in assets]
+
+        with self.lock:
+            for name in [n for n in self.manifest if n not in names]:
+                if os.path.exists(self.file(name)):
+                    os.remove(self.file(name))
+                del self.manifest[name]
+
+            with open(f'{self.manifest_file}.tmp', 'w') as f:
+                for entry in self.manifest.values():
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(f'{self.manifest_file}.tmp', self.manifest_file)
+
+
+def readTable(asset_name: str):
+    """
+    Download a table asset and parse it directly from the HTTP stream.
+
+    Args:
+        asset_name (str): Asset ID of the table.
+
+    Returns:
+        pd.DataFrame: The table content, with the 'system:index' and '.geo' columns from Earth Engine.
+    """
+    url = backend.getBackend().download_url(asset_name)
+
+    with urlopen(url) as response:
+        return pd.read_csv(response, index_col=None, header=0)
+
+
+def zoneCentroids(geo: pd.Series):
+    """
+    Compute the centroids of GeoJSON geometries, parsing each distinct geometry only once.
+
+    All the metrics rows of a zone share the same geometry: the distinct geometries are parsed and their centroids
+    computed with the Shapely 2 vectorized functions, then broadcast back to every row.
+
+    Args:
+        geo (pd.Series): GeoJSON geometries (the '.geo' column of an Earth Engine table).
+
+    Returns:
+        np.ndarray: Centroid of each row (None where the geometry is missing).
+    """
+    codes, uniques = pd.factorize(geo)
+
+    centroids = shapely.centroid(shapely.from_geojson(np.asarray(uniques, dtype=object)))
+
+    # Les codes -1 (géométrie manquante) pointent sur le None ajouté en fin de tableau
+    return np.append(centroids, None)[codes]
+
+
+def cleanMetrics(df: pd.DataFrame, fid_field: str):
+    """
+    Clean a raw metrics table for compatibility with riviewlet (https://github.com/lvaudor/riviewlet).
+
+    Args:
+        df (pd.DataFrame): Raw metrics table, as returned by readTable().
+        fid_field (str): Unique identifier field of the extraction zones.
+
+    Returns:
+        pd.DataFrame: Metrics with an ID column and the zone centroid as geometry.
+    """
+    df['ID'] = df[fid_field]
+    df['geometry'] = zoneCentroids(df['.geo'])
+    df = df.drop(['system:index', '.geo'], axis=1)
+
+    return df
+
+
+def typeMetrics(df: pd.DataFrame, fid_field: str):
+    """
+    Set compact column types on a cleaned metrics table: float32 metrics, datetime DATE and integer ID.
+
+    Args:
+        df (pd.DataFrame): Cleaned metrics table, as returned by cleanMetrics().
+        fid_field (str): Unique identifier field of the extraction zones.
+
+    Returns:
+        pd.DataFrame: The typed metrics table.
+    """
+    id_columns = ['ID', fid_field]
+
+    df['DATE'] = pd.to_datetime(df['DATE'], format='%Y-%m-%d')
+    for col in id_columns:
+        df[col] = df[col].astype('int64')
+
+    metrics_columns = [col for col in df.select_dtypes('number').columns if col not in id_columns]
+    df[metrics_columns] = df[metrics_columns].astype('float32')
+
+    return df
+
+
+def writeMetrics(df: pd.DataFrame, output_file: str, fid_field: str, partition_by: str = None):
+    """
+    Write a cleaned metrics table to CSV, Parquet or Feather (Arrow IPC).
+
+    Columnar formats are written with typed columns (see typeMetrics()), without the pandas index and with the
+    geometry column encoded as GeoParquet/GeoArrow. They need the pyarrow package.
+
+    Args:
+        df (pd.DataFrame): Cleaned metrics table, as returned by cleanMetrics().
+        output_file (str): Path to the output file (.csv, .parquet, .feather or .arrow). With partition_by, path to the output directory.
+        fid_field (str): Unique identifier field of the extraction zones.
+        partition_by (str, optional): 'fid' or 'year' to write a Hive-partitioned Parquet dataset (one sub-directory per zone or per year). The output directory is replaced. Defaults to None.
+    """
+    output_ext = os.path.splitext(output_file)[1]
+    assert output_ext in ['.csv', '.parquet', '.feather', '.arrow'], 'Output file should be a .csv, .parquet, .feather or .arrow file.'
+    assert partition_by in [None, 'fid', 'year'], 'partition_by should be None, "fid" or "year".'
+    assert not partition_by or output_ext == '.parquet', 'Partitioning is only available for .parquet output.'
+
+    if output_ext == '.csv':
+        df.to_csv(output_file)
+        return
+
+    gdf = gpd.GeoDataFrame(typeMetrics(df, fid_field), geometry='geometry', crs=4326)
+
+    if output_ext in ['.feather', '.arrow']:
+        gdf.to_feather(output_file)
+    elif not partition_by:
+        gdf.to_parquet(output_file, index=False)
+    else:
+        if partition_by == 'year':
+            gdf['YEAR'] = gdf['DATE'].dt.year
+        partition_column = 'ID' if partition_by == 'fid' else 'YEAR'
+
+        # Remplacer tout le dataset : les partitions d'un téléchargement précédent seraient lues avec les nouvelles
+        if os.path.isdir(output_file):
+            shutil.rmtree(output_file)
+        elif os.path.exists(output_file):
+            os.remove(output_file)
+
+        # Un sous-dossier par valeur, lisible comme un dataset partitionné Hive
+        for value, part in gdf.groupby(partition_column):
+            part_dir = os.path.join(output_file, f'{partition_column}={value}')
+            os.makedirs(part_dir, exist_ok=True)
+            part.drop(columns=partition_column).to_parquet(os.path.join(part_dir, 'part-0.parquet'), index=False)
+
+
+def downloadTables(assets: list, process=None, max_workers: int = 8, progress=None, cache: DownloadCache = None, overwrite: bool = False):
+    """
+    Download several table assets in parallel.
+
+    Args:
+        assets (list): Assets to download, as returned by ee.data.listAssets().
+        process (callable, optional): Function applied to each downloaded DataFrame, in the worker thread. Defaults to None.
+        max_workers (int, optional): Maximum number of concurrent downloads. Defaults to 8.
+        progress (callable, optional): Called as progress(done, total, asset_name) after each asset. Defaults to None.
+        cache (DownloadCache, optional): Cache used to skip the assets unchanged since their last download. Defaults to None.
+        overwrite (bool, optional): If True, download all the assets again, even if they are cached. Defaults to False.
+
+    Returns:
+        list: The processed DataFrames, in the assets order.
+    """
+
+    def download(asset):
+        if cache and not overwrite and cache.is_fresh(asset):
+            return cache.read(asset)
+
+        df = readTable(asset['name'])
+        if process:
+            df = process(df)
+
+        if cache:
+            cache.write(asset, df)
+        return df
+
+    def report(done, total, outcome):
+        if progress:
+            progress(done, total, outcome['item']['name'])
+
+    outcomes = task_management.runConcurrently(download, assets, max_workers=max_workers, progress=report)
+
+    errors = [o for o in outcomes if o['error']]
+    if errors:
+        raise RuntimeError(f'{len(errors)} assets could not be downloaded: ' +
+                           ', '.join(f'{o["item"]["name"]} ({o["error"]})' for o in errors))
+
+    return [o['result'] for o in outcomes]
@@ -0,0 +1,289 @@
+import sys
+import time
+import logging
+import threading
+import contextvars
+
+import pandas as pd
+
+from contextlib import contextmanager
+
+from glourbee import backend
+
+
+logger = logging.getLogger(__name__)
+
+# Phases imbriquées courantes, et site d'appel hérité par les threads de runConcurrently
+_phases = contextvars.ContextVar('glourbee_phases', default=())
+_origin = contextvars.ContextVar('glourbee_origin', default=None)
+
+# Nombre d'enregistrements en cours (rien n'est calculé quand il n'y en a aucun)
+_active = 0
+_active_lock = threading.Lock()
+
+# Fonctions qui ne sont pas des sites d'appel
+SKIPPED_MODULES = ['glourbee.backend', 'glourbee.instrumentation', 'contextlib']
+SKIPPED_FUNCTIONS = [('glourbee.task_management', 'runConcurrently')]
+
+
+def isActive():
+    """
+    Tell if requests are being recorded.
+    """
+    return _active > 0
+
+
+def currentPhase():
+    """
+    Get the current operation phase, nested phases being joined by '/' (e.g. 'upload/wait'), or None.
+    """
+    phases = _phases.get()
+    return '/'.join(phases) if phases else None
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Attribute the requests of a block (or of a function, used as a decorator) to an operation phase.
+
+    Args:
+        name (str): Phase name. Phases can be nested.
+    """
+    token = _phases.set(_phases.get() + (name,))
+    try:
+        yield
+    finally:
+        _phases.reset(token)
+
+
+def callSite():
+    """
+    Get the function which sent the current request, as 'module.function', skipping the backend internals.
+
+    In the threads of task_management.runConcurrently, this is the function which started the batch.
+    """
+    origin = _origin.get()
+    if origin:
+        return origin
+
+    frame = sys._getframe(1)
+    while frame:
+        module = frame.f_globals.get('__name__', '')
+        function = frame.f_code.co_name
+        if module not in SKIPPED_MODULES and (module, function) not in SKIPPED_FUNCTIONS:
+            qualname = getattr(frame.f_code, 'co_qualname', function)
+            return f"{module.removeprefix('glourbee.')}.{qualname}"
+        frame = frame.f_back
+
+    return None
+
+
+def propagate(func):
+    """
+    Wrap a function run in other threads so that its requests keep the phase and the call site of the current thread.
+
+    Args:
+        func (callable): Function to wrap.
+
+    Returns:
+        callable: The wrapped function (func itself when no request is being recorded).
+    """
+    if not isActive():
+        return func
+
+    context = contextvars.copy_context()
+    site = callSite()
+
+    def run(*args, **kwargs):
+        def call():
+            _origin.set(site)
+            return func(*args, **kwargs)
+        # Chaque appel dans sa propre copie : un contexte ne peut pas être utilisé par deux threads à la fois
+        return context.copy().run(call)
+
+    return run
+
+
+class Recording:
+    """
+    Requests recorded by instrument().
+    """
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def record(self, call: str, site: str, phase: str, seconds: float, error: Exception = None):
+        """
+        Record a request and log it.
+
+        Args:
+            call (str): Backend method of the request.
+            site (str): Call site of the request.
+            phase (str): Operation phase of the request.
+            seconds (float): Duration of the request.
+            error (Exception, optional): Exception raised by the request. Defaults to None.
+        """
+        event = {
+            'call': call,
+            'site': site,
+            'phase': phase,
+            'seconds': seconds,
+            'error': type(error).__name__ if error else None,
+        }
+
+        with self.lock:
+            self.events.append(event)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'{call} from {site} in phase {phase}: {seconds:.3f} s{" (" + event["error"] + ")" if error else ""}',
+                         extra={'rpc': event})
+
+    def summary(self, by: list = ['PHASE', 'CALL', 'SITE']):
+        """
+        Summarize the recorded requests.
+
+        Args:
+            by (list, optional): Grouping columns, among 'PHASE', 'CALL' and 'SITE'. Defaults to ['PHASE', 'CALL', 'SITE'].
+
+        Returns:
+            pd.DataFrame: One row per group with the REQUESTS, ERRORS, SECONDS, MEAN_SECONDS and MAX_SECONDS columns, the slowest groups first.
+        """
+        with self.lock:
+            df = pd.DataFrame(self.events, columns=['call', 'site', 'phase', 'seconds', 'error'])
+
+        df.columns = [col.upper() for col in df.columns]
+        df[by] = df[by].fillna('-')
+
+        summary = df.groupby(by).agg(REQUESTS=('SECONDS', 'size'),
+                                     ERRORS=('ERROR', 'count'),
+                                     SECONDS=('SECONDS', 'sum'),
+                                     MEAN_SECONDS=('SECONDS', 'mean'),
+                                     MAX_SECONDS=('SECONDS', 'max'))
+
+        return summary.sort_values('SECONDS', ascending=False).reset_index()
+
+    def counts(self):
+        """
+        Count the recorded requests of each backend method.
+
+        Returns:
+            dict: Number of requests by backend method.
+        """
+        with self.lock:
+            return pd.Series([event['call'] for event in self.events], dtype=str).value_counts().to_dict()
+
+
+class InstrumentedBackend(backend.Backend):
+    """
+    Backend wrapper recording every request sent to another backend.
+    """
+
+    def __init__(self, inner: backend.Backend, recording: Recording):
+        """
+        Initialize the InstrumentedBackend object.
+
+        Args:
+            inner (Backend): Backend receiving the requests.
+            recording (Recording): Recording of the requests.
+        """
+        self.inner = inner
+        self.recording = recording
+
+    def _call(self, name: str, func, *args, **kwargs):
+        site = callSite()
+        current_phase = currentPhase()
+        error = None
+        start = time.perf_counter()
+
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.recording.record(name, site, current_phase, time.perf_counter() - start, error)
+
+    def list_assets(self, parent: str):
+        return self._call('list_assets', self.inner.list_assets, parent)
+
+    def create_folder(self, asset_id: str):
+        return self._call('create_folder', self.inner.create_folder, asset_id)
+
+    def delete_asset(self, asset_id: str):
+        return self._call('delete_asset', self.inner.delete_asset, asset_id)
+
+    def read_table(self, asset_id: str):
+        return self._call('read_table', self.inner.read_table, asset_id)
+
+    def first_features(self, asset_ids: list):
+        return self._call('first_features', self.inner.first_features, asset_ids)
+
+    def get_info(self, obj):
+        return self._call('get_info', self.inner.get_info, obj)
+
+    def export_table(self, collection, description: str, asset_id: str):
+        # La tache est créée côté client : seul son démarrage envoie une requête
+        task = self.inner.export_table(collection, description, asset_id)
+        start = task.start
+        task.start = lambda: self._call('start', start)
+
+        return task
+
+    def list_operations(self):
+        return self._call('list_operations', self.inner.list_operations)
+
+    def get_operation(self, name: str):
+        return self._call('get_operation', self.inner.get_operation, name)
+
+    def cancel_operation(self, name: str):
+        return self._call('cancel_operation', self.inner.cancel_operation, name)
+
+    def download_url(self, asset_id: str):
+        return self._call('download_url', self.inner.download_url, asset_id)
+
+
+@contextmanager
+def instrument(recording: Recording = None, log_summary: bool = True):
+    """
+    Record the requests sent through the current backend in a with block.
+
+    Every request is counted and timed, with its call site (the function of the calling code) and the current
+    operation phase:
+
+        with instrumentation.instrument() as recording:
+            metrics_ds = workflow.startWorkflow(zones)
+            metrics_ds.wait_for_tasks()
+
+        print(recording.summary())
+
+    Each request is also logged as a structured DEBUG event of the 'glourbee.instrumentation' logger (the event dict
+    is in the 'rpc' attribute of the log record).
+
+    Args:
+        recording (Recording, optional): Recording to add the requests to, e.g. to accumulate several blocks. Defaults to None (a new Recording).
+        log_summary (bool, optional): If True, log the summary of the requests at the end of the block. Defaults to True.
+
+    Yields:
+        Recording: The recording of the requests.
+    """
+    global _active
+
+    recording = recording or Recording()
+
+    with _active_lock:
+        _active += 1
+    try:
+        with backend.useBackend(InstrumentedBackend(backend.getBackend(), recording)):
+            yield recording
+    finally:
+        with _active_lock:
+            _active -= 1
+        recording.seconds = time.perf_counter() - recording.start
+
+        if log_summary and recording.events:
+            summary = recording.summary()
+            logger.info(f'{summary["REQUESTS"].sum()} requests in {recording.seconds:.1f} s '
+                        f'({summary["SECONDS"].sum():.1f} s spent in requests)\n{summary.to_string(index=False)}')
@@ -0,0 +1,288 @@
+import ast
+import shapely
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+from scipy import ndimage
+
+try:
+    import rasterio
+except ImportError:
+    rasterio = None
+
+
+BANDS = ['blue', 'green', 'red', 'nir', 'swir1', 'swir2']
+
+PERCENTILES = list(range(0, 110, 10))
+
+# Connexité 8 dans chaque image, aucune connexion entre deux dates
+STRUCTURE = np.zeros((3, 3, 3), dtype=bool)
+STRUCTURE[1] = True
+
+
+def readStack(paths: list, bands: list = None):
+    """
+    Read a time stack from GeoTIFF files (one file per date, same grid). Needs the rasterio package.
+
+    :param paths (list): Paths of the GeoTIFF files, in time order.
+    :param bands (list, optional): Band names of the files. Defaults to the band descriptions of the first file, or BANDS (plus 'CLOUDS' for a 7th band).
+
+    :returns stack (dict), transform (affine.Affine): Band name -> array (time, rows, cols), and the geotransform of the grid.
+    """
+    if rasterio is None:
+        raise ImportError('Reading GeoTIFF files needs the rasterio package (pip install rasterio).')
+
+    images = []
+    for path in paths:
+        with rasterio.open(path) as src:
+            if bands is None:
+                bands = list(src.descriptions) if all(src.descriptions) else (BANDS + ['CLOUDS'])[:src.count]
+            transform = src.transform
+            data = src.read(masked=True).astype('float32')
+            images.append(data.filled(np.nan))
+
+    stack = np.stack(images)
+    return {band: stack[:, i] for i, band in enumerate(bands)}, transform
+
+
+def evaluateExpression(expression: str, variables: dict):
+    """
+    Evaluate an Earth Engine band expression (e.g. 'MNDWI > -0.4 && NDVI < 0.2') on arrays.
+
+    :param expression (str): Expression with comparisons, arithmetic and the &&, || and ! operators.
+    :param variables (dict): Arrays of the variables of the expression.
+
+    :returns result (np.ndarray): Boolean (or numeric) array.
+    """
+    source = expression.replace('&&', ' and ').replace('||', ' or ').replace('!=', ' <> ').replace('!', ' not ').replace(' <> ', '!=')
+    tree = ast.parse(source.strip(), mode='eval')
+
+    comparisons = {ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less, ast.LtE: np.less_equal,
+                   ast.Eq: np.equal, ast.NotEq: np.not_equal}
+    operations = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+    def visit(node):
+        if isinstance(node, ast.Expression):
+            return visit(node.body)
+        if isinstance(node, ast.BoolOp):
+            reduce = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return reduce.reduce([visit(value) for value in node.values])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return np.logical_not(visit(node.operand))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return np.negative(visit(node.operand))
+        if isinstance(node, ast.Compare):
+            result, left = True, visit(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = visit(comparator)
+                result = np.logical_and(result, comparisons[type(op)](left, right))
+                left = right
+            return result
+        if isinstance(node, ast.BinOp) and type(node.op) in operations:
+            return operations[type(node.op)](visit(node.left), visit(node.right))
+        if isinstance(node, ast.Name):
+            return variables[node.id]
+        if isinstance(node, ast.Constant):
+            return node.value
+        raise ValueError(f'Unsupported expression: {expression}')
+
+    return visit(tree)
+
+
+def calculateIndicators(stack: dict):
+    """
+    Calculate the MNDWI, NDVI, NDWI and BSI of each image of the stack, as classification.calculateIndicators().
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stack = dict(stack)
+        stack['MNDWI'] = (stack['green'] - stack['swir1']) / (stack['green'] + stack['swir1'])
+        stack['NDVI'] = (stack['nir'] - stack['red']) / (stack['nir'] + stack['red'])
+        stack['NDWI'] = (stack['green'] - stack['nir']) / (stack['green'] + stack['nir'])
+        stack['BSI'] = ((stack['swir1'] + stack['red']) - (stack['nir'] + stack['blue'])) / ((stack['swir1'] + stack['red']) + (stack['nir'] + stack['blue']))
+
+    return stack
+
+
+def focalMode(mask: np.ndarray, valid: np.ndarray, radius: int = 3):
+    """
+    Modal filter of a binary mask on a circular kernel, on each image of a stack (as ee.Image.focalMode()).
+    """
+    y, x = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    kernel = (x * x + y * y <= radius * radius).astype('float32')[np.newaxis]
+
+    ones = ndimage.convolve((mask & valid).astype('float32'), kernel, mode='constant')
+    zeros = ndimage.convolve((~mask & valid).astype('float32'), kernel, mode='constant')
+
+    return ones > zeros
+
+
+def classifyObjects(stack: dict,
+                    watermask_expression: str = 'MNDWI >  0.0',
+                    activechannel_expression: str = 'MNDWI > -0.4 && NDVI < 0.2',
+                    vegetation_expression: str = 'NDVI > 0.15'):
+    """
+    Classify the WATER, VEGETATION and AC pixels of each image of the stack, as classification.classifyObjects().
+
+    Cloudy pixels (CLOUDS band equal to 0) are masked first, as by the cloud masking of data_management.
+    """
+    stack = calculateIndicators(stack)
+
+    valid = ~np.isnan(stack['MNDWI']) & ~np.isnan(stack['NDVI'])
+    if 'CLOUDS' in stack:
+        valid &= stack['CLOUDS'] == 1
+
+    variables = {band.upper(): stack[band] for band in BANDS}
+    variables.update({index: stack[index] for index in ['MNDWI', 'NDWI', 'NDVI']})
+
+    with np.errstate(invalid='ignore'):
+        for band, expression in [('WATER', watermask_expression),
+                                 ('VEGETATION', vegetation_expression),
+                                 ('AC', activechannel_expression)]:
+            stack[band] = focalMode(np.asarray(evaluateExpression(expression, variables), dtype=bool), valid) & valid
+
+    stack['VALID'] = valid
+    return stack
+
+
+def zoneMask(geometry, shape: tuple, transform):
+    """
+    Rasterize a zone on the grid: pixels whose center is inside the geometry.
+
+    :param geometry (shapely.Geometry): Zone geometry, in the CRS of the grid.
+    :param shape (tuple): (rows, cols) of the grid.
+    :param transform (affine.Affine | tuple): Geotransform (a, b, c, d, e, f) of a north-up grid: x = a * col + c, y = e * row + f.
+
+    :returns window (tuple), mask (np.ndarray): Row and column slices of the zone bounding box, and the zone mask in this window.
+    """
+    a, _, c, _, e, f = tuple(transform)[:6]
+    minx, miny, maxx, maxy = geometry.bounds
+
+    cols = sorted([(minx - c) / a, (maxx - c) / a])
+    rows = sorted([(maxy - f) / e, (miny - f) / e])
+    col_slice = slice(max(int(np.floor(cols[0])), 0), min(int(np.ceil(cols[1])), shape[1]))
+    row_slice = slice(max(int(np.floor(rows[0])), 0), min(int(np.ceil(rows[1])), shape[0]))
+
+    col_index, row_index = np.meshgrid(np.arange(col_slice.start, col_slice.stop), np.arange(row_slice.start, row_slice.stop))
+    mask = shapely.contains_xy(geometry, a * (col_index + 0.5) + c, e * (row_index + 0.5) + f)
+
+    return (row_slice, col_slice), mask
+
+
+def objectsMetrics(objects: np.ndarray, scale: float):
+    """
+    Count, size percentiles and perimeter of the 8-connected objects of each image of a stack (time, rows, cols).
+
+    :returns count (np.ndarray), percentiles (np.ndarray), perimeter (np.ndarray): One value (one row of percentiles) per image. Percentiles are NaN without objects.
+    """
+    n_times = objects.shape[0]
+
+    labels, n_objects = ndimage.label(objects, structure=STRUCTURE)
+    sizes = np.bincount(labels.ravel(), minlength=n_objects + 1)[1:]
+
+    # Date de chaque objet
+    times = np.zeros(n_objects, dtype=int)
+    times[labels[objects] - 1] = np.broadcast_to(np.arange(n_times)[:, np.newaxis, np.newaxis], objects.shape)[objects]
+
+    count = np.bincount(times, minlength=n_times)
+    percentiles = np.full((n_times, len(PERCENTILES)), np.nan)
+    for t in np.unique(times):
+        percentiles[t] = np.percentile(sizes[times == t], PERCENTILES)
+
+    # Périmètre : côtés de pixels entre un objet et le reste (ou le bord de la zone)
+    padded = np.pad(objects, ((0, 0), (1, 1), (1, 1)))
+    edges = (np.diff(padded, axis=1) != 0).sum(axis=(1, 2)) + (np.diff(padded, axis=2) != 0).sum(axis=(1, 2))
+
+    return count, percentiles, edges * scale
+
+
+def _meanOver(values: np.ndarray, mask: np.ndarray):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nansum(np.where(mask, values, 0), axis=(1, 2)) / (mask & ~np.isnan(values)).sum(axis=(1, 2))
+
+
+def zonesMetrics(stack: dict,
+                 dates: list,
+                 zones: gpd.GeoDataFrame,
+                 transform,
+                 watermask_expression: str = 'MNDWI >  0.0',
+                 activechannel_expression: str = 'MNDWI > -0.4 && NDVI < 0.2',
+                 vegetation_expression: str = 'NDVI > 0.15'):
+    """
+    Compute the metrics of each zone on each image of a local time stack, as zones_metrics.calculateZONEsMetrics().
+
+    Polygon counts and size percentiles come from a connected-component labelling of the classified pixels: sizes
+    are in pixels, perimeters are the length of the objects pixel edges. Images 100% cloudy over a zone are left out.
+
+    :param stack (dict): Band name -> array (time, rows, cols) with NaN where there is no data, e.g. from readStack(). Bands are named as in data_management ('blue', 'green', 'red', 'nir', 'swir1', 'swir2', and optionally 'CLOUDS' with 1 for clear pixels).
+    :param dates (list): Date of each image of the stack.
+    :param zones (gpd.GeoDataFrame): Extraction zones, in the CRS of the stack.
+    :param transform (affine.Affine | tuple): Geotransform of the stack (see zoneMask()).
+    :param watermask_expression (str, optional): Expression for water mask. Defaults to 'MNDWI >  0.0'.
+    :param activechannel_expression (str, optional): Expression for active channel mask. Defaults to 'MNDWI > -0.4 && NDVI < 0.2'.
+    :param vegetation_expression (str, optional): Expression for vegetation mask. Defaults to 'NDVI > 0.15'.
+
+    :returns metrics (pd.DataFrame): One row per zone and per image, with the zone attributes and the metrics columns.
+    """
+    classified = classifyObjects(stack, watermask_expression, activechannel_expression, vegetation_expression)
+    scale = abs(tuple(transform)[0])
+    shape = classified['VALID'].shape[1:]
+    dates = pd.to_datetime(pd.Series(dates)).dt.strftime('%Y-%m-%d').to_numpy()
+
+    attributes = pd.DataFrame(zones.drop(columns=zones.geometry.name))
+    rows = []
+
+    for i, geometry in enumerate(zones.geometry):
+        window, mask = zoneMask(geometry, shape, transform)
+        n_pixels = mask.sum()
+        if n_pixels == 0:
+            continue
+
+        band = lambda name: classified[name][(slice(None),) + window]
+        valid = band('VALID') & mask
+
+        # Nuages : pixels non clairs ou sans données, comme image.unmask() côté Earth Engine
+        clear = (band('CLOUDS') == 1) if 'CLOUDS' in classified else np.ones_like(valid)
+        has_data = ~np.isnan(band('red'))
+        cloud_score = np.round(((~(clear & has_data)) & mask).sum(axis=(1, 2)) / n_pixels * 100)
+        coverage_score = np.round((has_data & mask).sum(axis=(1, 2)) / n_pixels * 100)
+
+        metrics = {
+            'DATE': dates,
+            'CLOUD_SCORE': cloud_score,
+            'COVERAGE_SCORE': coverage_score,
+            'SCALE': np.full(len(dates), scale),
+        }
+
+        for name, prefix in [('WATER', 'WATER'), ('VEGETATION', 'VEGETATION')]:
+            objects = band(name) & mask
+            count, percentiles, perimeter = objectsMetrics(objects, scale)
+            metrics.update({f'{prefix}_POLYGONS_p{pc}': percentiles[:, j] for j, pc in enumerate(PERCENTILES)})
+            metrics[f'{prefix}_POLYGONS'] = count
+            metrics[f'{prefix}_AREA'] = objects.sum(axis=(1, 2))
+            metrics[f'{prefix}_PERIMETER'] = perimeter
+
+        water = band('WATER') & mask
+        vegetation = band('VEGETATION') & mask
+        ac = band('AC') & mask
+
+        metrics.update({
+            'MEAN_WATER_MNDWI': _meanOver(band('MNDWI'), water),
+            'MEAN_MNDWI': _meanOver(band('MNDWI'), valid),
+            'MEAN_BSI': _meanOver(band('BSI'), valid),
+            'MEAN_VEGETATION_NDVI': _meanOver(band('NDVI'), vegetation),
+            'MEAN_VEGETATION_MNDWI': _meanOver(band('MNDWI'), vegetation),
+            'MEAN_NDVI': _meanOver(band('NDVI'), valid),
+            'AC_AREA': ac.sum(axis=(1, 2)),
+            'MEAN_AC_NDVI': _meanOver(band('NDVI'), ac),
+            'MEAN_AC_MNDWI': _meanOver(band('MNDWI'), ac),
+        })
+
+        zone_df = pd.DataFrame(metrics)
+        for col in reversed(attributes.columns):
+            zone_df.insert(0, col, attributes.iloc[i][col])
+
+        # Filtrer les images où le ZONE est 100% couvert de nuages
+        rows.append(zone_df[zone_df['CLOUD_SCORE'] < 100])
+
+    return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame()
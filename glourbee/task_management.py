@@ -0,0 +1,317 @@
+import ee
+import ee.batch
+import pandas as pd
+
+from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+
+from glourbee import (
+    backend,
+    instrumentation
+)
+
+
+ACTIVE_STATES = ['PENDING', 'READY', 'SUBMITTED', 'RUNNING', 'CANCELLING']
+COMPLETED_STATES = ['SUCCEEDED', 'COMPLETED']
+FAILED_STATES = ['FAILED']
+CANCELLED_STATES = ['CANCELLED']
+
+
+def runConcurrently(func, items, max_workers: int = 8, progress=None):
+    """
+    Apply a function on every item with a bounded pool of threads.
+
+    Exceptions raised by the function are captured per item instead of stopping the whole batch.
+
+    Args:
+        func (callable): Function called on each item (typically a blocking Earth Engine request).
+        items (iterable): Items to process.
+        max_workers (int, optional): Maximum number of concurrent calls. Defaults to 8.
+        progress (callable, optional): Called as progress(done, total, outcome) for each item, in the items order. Defaults to None.
+
+    Returns:
+        list: One dict per item, in the items order, with 'item', 'result' and 'error' keys.
+    """
+    items = list(items)
+
+    # Les requêtes des threads restent attribuées à la phase et au site d'appel courants
+    func = instrumentation.propagate(func)
+
+    def call(item):
+        try:
+            return {'item': item, 'result': func(item), 'error': None}
+        except Exception as e:
+            return {'item': item, 'result': None, 'error': e}
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map renvoie les résultats dans l'ordre des entrées
+        for outcome in executor.map(call, items):
+            outcomes.append(outcome)
+
+            if progress:
+                progress(len(outcomes), len(items), outcome)
+
+    return outcomes
+
+
+def startTasks(tasks: list, max_workers: int = 8, silent: bool = False):
+    """
+    Start Earth Engine tasks concurrently.
+
+    Args:
+        tasks (list): ee.batch.Task objects to start.
+        max_workers (int, optional): Maximum number of concurrent start requests. Defaults to 8.
+        silent (bool, optional): If True, do not print progress. Defaults to False.
+
+    Returns:
+        list: One dict per task, in the tasks order, with 'item' (the task), 'result' (the task id) and 'error' keys.
+    """
+
+    def start(task: ee.batch.Task):
+        task.start()
+        return task.id
+
+    def progress(done, total, outcome):
+        if not silent:
+            print(f'\r{done}/{total} tasks started', end=" ")
+
+    submissions = runConcurrently(start, tasks, max_workers=max_workers, progress=progress)
+
+    errors = [s for s in submissions if s['error']]
+    if errors and not silent:
+        print(f'\n{len(errors)} tasks could not be started:')
+        for s in errors:
+            print(f'  {s["item"].config.get("description")}: {s["error"]}')
+
+    return submissions
+
+
+class TaskTracker:
+    """
+    Keep track locally of the Earth Engine operations linked to a dataset.
+
+    Submitted tasks are recorded without any request to Earth Engine. The (expensive) full operations listing is only done on refresh().
+    """
+
+    def __init__(self, ee_project_name: str, description_filter: str):
+        """
+        Initialize the TaskTracker object.
+
+        Args:
+            ee_project_name (str): Earth Engine project name.
+            description_filter (str): Operations whose description contains this word (e.g. the dataset uuid) are linked to the dataset.
+        """
+        self.ee_project_name = ee_project_name
+        self.description_filter = description_filter
+        self.operations = {}
+
+    @property
+    def tasks(self):
+        """
+        Linked operations, as returned by ee.data.listOperations().
+        """
+        return [op for op in self.operations.values() if op['metadata']['state'] != 'COMPLETED']
+
+    def track(self, task: ee.batch.Task):
+        """
+        Record a started task as a pending operation.
+
+        Args:
+            task (ee.batch.Task): Started task.
+        """
+        name = getattr(task, 'name', None) or f'projects/{self.ee_project_name}/operations/{task.id}'
+
+        if name not in self.operations:
+            self.operations[name] = {
+                'name': name,
+                'metadata': {
+                    'description': task.config.get('description'),
+                    'state': 'PENDING',
+                },
+                'done': False,
+            }
+
+        return self.operations[name]
+
+    def update(self, operation: dict):
+        """
+        Update the record of an operation with a fresh state from Earth Engine.
+
+        Args:
+            operation (dict): Operation as returned by ee.data.getOperation() or ee.data.listOperations().
+        """
+        self.operations[operation['name']] = operation
+
+    def refresh(self):
+        """
+        Refresh the linked operations from the full Earth Engine operations listing.
+        """
+        for op in backend.getBackend().list_operations():
+            # Mot exact : 'test_upload' ne doit pas récupérer les taches de 'test_upload_packed'
+            if self.description_filter in op['metadata'].get('description', '').split():
+                self.update(op)
+
+
+class TaskMonitor:
+    """
+    Wait for the operations of a TaskTracker, polling only the tracked operations with an adaptive interval.
+    """
+
+    def __init__(self,
+                 tracker: TaskTracker,
+                 min_interval: float = 2,
+                 max_interval: float = 60,
+                 backoff: float = 1.5,
+                 list_threshold: int = 100,
+                 max_workers: int = 8,
+                 max_errors: int = 5,
+                 on_completed=None,
+                 on_failed=None,
+                 on_cancelled=None):
+        """
+        Initialize the TaskMonitor object.
+
+        Args:
+            tracker (TaskTracker): Tracker holding the operations to monitor.
+            min_interval (float, optional): Polling interval (seconds) used after a state transition. Defaults to 2.
+            max_interval (float, optional): Maximum polling interval (seconds) when nothing changes. Defaults to 60.
+            backoff (float, optional): Factor applied to the interval after each poll without transition. Defaults to 1.5.
+            list_threshold (int, optional): Above this number of active operations, one ee.data.listOperations() is cheaper than one ee.data.getOperation() per operation. Defaults to 100.
+            max_workers (int, optional): Maximum number of concurrent ee.data.getOperation() requests. Defaults to 8.
+            max_errors (int, optional): Number of consecutive polls where an operation cannot be fetched after which it is considered failed. Defaults to 5.
+            on_completed (callable, optional): Called with the operation dict when an operation succeeds. Defaults to None.
+            on_failed (callable, optional): Called with the operation dict when an operation fails. Defaults to None.
+            on_cancelled (callable, optional): Called with the operation dict when an operation is cancelled. Defaults to None.
+        """
+        self.tracker = tracker
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.list_threshold = list_threshold
+        self.max_workers = max_workers
+        self.max_errors = max_errors
+        self.errors = {}
+        self.callbacks = {
+            'completed': on_completed,
+            'failed': on_failed,
+            'cancelled': on_cancelled,
+        }
+
+    @property
+    def active(self):
+        """
+        Names of the tracked operations which are not finished yet.
+        """
+        return [name for name, op in self.tracker.operations.items() if op['metadata']['state'] in ACTIVE_STATES]
+
+    def poll(self):
+        """
+        Fetch the state of the active operations, fire the callbacks of the state transitions.
+
+        Returns:
+            list: Operations which changed state since the previous poll.
+        """
+        active = self.active
+        if not active:
+            return []
+
+        if len(active) > self.list_threshold:
+            listed = {op['name']: op for op in backend.getBackend().list_operations() if op['name'] in active}
+            operations = list(listed.values())
+            errors = {name: 'not found in the operations listing' for name in active if name not in listed}
+        else:
+            outcomes = runConcurrently(backend.getBackend().get_operation, active, max_workers=self.max_workers)
+            operations = [o['result'] for o in outcomes if not o['error']]
+            errors = {o['item']: o['error'] for o in outcomes if o['error']}
+
+        # Compter les échecs consécutifs de chaque opération : au-delà de max_errors (opération supprimée, nom
+        # erroné, droits insuffisants...), elle est considérée en échec pour ne pas attendre indéfiniment
+        for op in operations:
+            self.errors.pop(op['name'], None)
+        for name, error in errors.items():
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+            if self.errors[name] >= self.max_errors:
+                tracked = self.tracker.operations[name]
+                operations.append({**tracked,
+                                   'metadata': {**tracked['metadata'], 'state': 'FAILED'},
+                                   'done': True,
+                                   'error': {'message': f'Operation state unavailable after {self.errors[name]} attempts: {error}'}})
+
+        transitions = []
+        for op in operations:
+            previous = self.tracker.operations[op['name']]['metadata']['state']
+            state = op['metadata']['state']
+            self.tracker.update(op)
+
+            if state == previous:
+                continue
+            transitions.append(op)
+
+            if state in COMPLETED_STATES:
+                event = 'completed'
+            elif state in FAILED_STATES:
+                event = 'failed'
+            elif state in CANCELLED_STATES:
+                event = 'cancelled'
+            else:
+                continue
+
+            if self.callbacks[event]:
+                self.callbacks[event](op)
+
+        return transitions
+
+    def wait(self, silent: bool = False):
+        """
+        Block until all the tracked operations are finished.
+
+        Args:
+            silent (bool, optional): If True, do not print progress. Defaults to False.
+        """
+        interval = self.min_interval
+
+        while True:
+            transitions = self.poll()
+            active = self.active
+
+            if len(active) == 0:
+                break
+
+            if not silent:
+                unavailable = len([name for name in active if name in self.errors])
+                print(f'\rwaiting for {len(active)} tasks to finish' + (f' ({unavailable} unavailable)' if unavailable else ''), end=" ")
+
+            # Revenir à l'intervalle minimal dès qu'une tache change d'état
+            if transitions:
+                interval = self.min_interval
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+
+            sleep(interval)
+
+    def timings(self):
+        """
+        Timings of the tracked operations, from the Earth Engine operations metadata.
+
+        Returns:
+            pd.DataFrame: One row per operation with its description, state, queued, running and total durations (seconds).
+        """
+        rows = []
+        for name, op in self.tracker.operations.items():
+            metadata = op['metadata']
+            create = pd.Timestamp(metadata['createTime']) if 'createTime' in metadata else None
+            start = pd.Timestamp(metadata['startTime']) if 'startTime' in metadata else None
+            end = pd.Timestamp(metadata['endTime']) if 'endTime' in metadata else None
+
+            rows.append({
+                'name': name,
+                'description': metadata.get('description'),
+                'state': metadata['state'],
+                'queued': (start - create).total_seconds() if create and start else None,
+                'running': (end - start).total_seconds() if start and end else None,
+                'total': (end - create).total_seconds() if create and end else None,
+            })
+
+        return pd.DataFrame(rows, columns=['name', 'description', 'state', 'queued', 'running', 'total'])
@@ -12,6 +12,7 @@ import os
 import numpy as np
 
 from glourbee import __version__ as glourbee_version
+from glourbee import backend
 
 
 ### UI
@@ -176,7 +177,7 @@ def display_map(title, location=[0, 0], zones_features=None, zoom=8):
 
     if zones_features:
         features = zones_features
-        folium.GeoJson(data=features.getInfo(), name="ZONE Features").add_to(m)
+        folium.GeoJson(data=backend.getBackend().get_info(features), name="ZONE Features").add_to(m)
 
     return m
 
@@ -227,18 +228,9 @@ def zone_to_search(town_to_search, river_to_search):
     list
         list of the matching zones id and time of upload
     """
-    list_assets = ee.data.listAssets({'parent': "projects/ee-glourb/assets/zones"})["assets"]
-    id = []
-    update_times = []
-    for i in range(len(list_assets)):
-        id.append(
-            ee.data.listAssets({'parent': "projects/ee-glourb/assets/zones"})["assets"][i]["id"]
-        )
-        update_times.append(
-            ee.data.listAssets({'parent': "projects/ee-glourb/assets/zones"})["assets"][i][
-                "updateTime"
-            ]
-        )
+    list_assets = backend.getBackend().list_assets("projects/ee-glourb/assets/zones")
+    id = [asset["id"] for asset in list_assets]
+    update_times = [asset["updateTime"] for asset in list_assets]
 
     matching_lines = []
     matching_times = []
@@ -263,7 +255,7 @@ def remove_line_by_criteria(id_to_remove):
     """
     asset_path_to_delete = id_to_remove
     try:
-        ee.data.deleteAsset(asset_path_to_delete)
+        backend.getBackend().delete_asset(asset_path_to_delete)
 
     except Exception as e:
         st.error(f"Error: {str(e)}")
@@ -361,7 +353,7 @@ def uploadExtractionZones(
         ):
             # Delete temporary assets
             for asset in assets_list:
-                ee.data.deleteAsset(asset)
+                backend.getBackend().delete_asset(asset)
 
             # Return the final asset and its assetId
             return assetId, ee.FeatureCollection(assetId)
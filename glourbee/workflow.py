@@ -1,5 +1,6 @@
 import ee
 import os
+import heapq
 import pandas as pd
 from urllib.request import urlretrieve, urlopen
 from io import StringIO
@@ -7,15 +8,120 @@ from io import StringIO
 import tempfile
 
 from glourbee import (
+    backend,
+    instrumentation,
     classification,
     data_management,
     zones_indicators,
     zones_metrics,
-    assets_management
+    assets_management,
+    task_management
 )
 
 tempdir = tempfile.mkdtemp(prefix='glourbee_')
 
+# Pixel size (meters) of each satellite imagery dataset
+SCALES = {
+    'Landsat': 30,
+    'Sentinel-2': 10,
+}
+
+# Default masks expressions for each satellite imagery dataset
+DEFAULT_EXPRESSIONS = {
+    'Landsat': {
+        'watermask_expression': 'MNDWI >  0.0',
+        'activechannel_expression': 'MNDWI > -0.4 && NDVI < 0.2',
+        'vegetation_expression': 'NDVI > 0.15',
+    },
+    'Sentinel-2': {
+        'watermask_expression': 'NDWI > -0.1',
+        'activechannel_expression': 'NDWI > -0.4 && NDVI < 0.2',
+        'vegetation_expression': 'NDVI > 0.15',
+    },
+}
+
+
+def buildCollection(satellite_type: str = 'Landsat',
+                    start: str = '1980-01-01',
+                    end: str = '2030-12-31',
+                    cloud_filter: int = 80,
+                    cloud_masking: bool = True,
+                    mosaic_same_day: bool = True,
+                    watermask_expression: str = None,
+                    activechannel_expression: str = None,
+                    vegetation_expression: str = None,
+                    roi=None):
+    """
+    Build the preprocessed and classified satellite image collection used to compute the metrics.
+
+    :param satellite_type (str, optional): Type of satellite imagery to use, 'Landsat' or 'Sentinel-2'. Defaults to 'Landsat'.
+    :param start (str, optional): Start date for image collection (inclusive), formatted as 'YYYY-MM-DD'. Defaults to '1980-01-01'.
+    :param end (str, optional): End date for image collection (inclusive), formatted as 'YYYY-MM-DD'. Defaults to '2030-12-31'.
+    :param cloud_filter (int, optional): Maximum cloud coverage accepted for images, in percentage. Defaults to 80.
+    :param cloud_masking (bool, optional): Whether to mask clouds on accepted images. Defaults to True.
+    :param mosaic_same_day (bool, optional): Whether to merge all images taken on the same day. Defaults to True.
+    :param watermask_expression (str, optional): Expression for water mask. Defaults to the satellite_type default expression.
+    :param activechannel_expression (str, optional): Expression for active channel mask. Defaults to the satellite_type default expression.
+    :param vegetation_expression (str, optional): Expression for vegetation mask. Defaults to the satellite_type default expression.
+    :param roi (ee.Geometry | ee.FeatureCollection, optional): Region of interest used to filter the images. Defaults to None.
+
+    :returns collection (ee.ImageCollection): Image collection with the indicators and the WATER, VEGETATION and AC bands.
+    """
+    assert satellite_type in ['Landsat', 'Sentinel-2'], ('Satellite dataset not correctly defined. Set satellite_type either to "Landsat" or "Sentinel-2"')
+
+    if satellite_type == 'Landsat':
+        # Get the landsat image collection for your ROI
+        collection = data_management.getLandsatCollection(start=ee.Date(start), 
+                                                          end=ee.Date(end), 
+                                                          cloud_filter=cloud_filter, # Maximum cloud coverage accepted (%)
+                                                          cloud_masking=cloud_masking, # Set to False if you don't want to mask the clouds on accepted images
+                                                          mosaic_same_day=mosaic_same_day, # Set to False if you don't want to merge all images by day
+                                                          roi=roi) 
+
+    elif satellite_type == 'Sentinel-2':
+        # Get the Sentinel-2 image collection for your ROI
+        collection = data_management.getSentinelCollection(start=ee.Date(start), 
+                                                           end=ee.Date(end), 
+                                                           cloud_filter=cloud_filter, # Maximum cloud coverage accepted (%)
+                                                           cloud_masking=cloud_masking, # Set to False if you don't want to mask the clouds on accepted images
+                                                           mosaic_same_day=mosaic_same_day, # Set to False if you don't want to merge all images by day
+                                                           roi=roi) 
+
+    # Calculate MNDWI, NDVI and NDWI
+    collection = classification.calculateIndicators(collection)
+
+    # Classify the objects using the indicators
+    collection = classification.classifyObjects(collection=collection, 
+                                                watermask_expression=watermask_expression or DEFAULT_EXPRESSIONS[satellite_type]['watermask_expression'], 
+                                                activechannel_expression=activechannel_expression or DEFAULT_EXPRESSIONS[satellite_type]['activechannel_expression'], 
+                                                vegetation_expression=vegetation_expression or DEFAULT_EXPRESSIONS[satellite_type]['vegetation_expression'])
+
+    return collection
+
+
+def timeWindows(start: str, end: str, years: int = None):
+    """
+    Split a date range into consecutive time windows.
+
+    :param start (str): Start date of the range, formatted as 'YYYY-MM-DD'.
+    :param end (str): End date of the range, formatted as 'YYYY-MM-DD'.
+    :param years (int, optional): Length of each window, in years. Defaults to None (one single window).
+
+    :returns windows (list): (start, end) tuples of dates formatted as 'YYYY-MM-DD'. The end of a window is the start of the next one.
+    """
+    if not years:
+        return [(start, end)]
+
+    windows = []
+    window_start = pd.Timestamp(start)
+    while window_start < pd.Timestamp(end):
+        window_end = min(window_start + pd.DateOffset(years=years), pd.Timestamp(end))
+        windows.append((window_start.strftime('%Y-%m-%d'), window_end.strftime('%Y-%m-%d')))
+        window_start = window_end
+
+    return windows
+
+
 def startWorkflow(zones_dataset: assets_management.ExtractionZones,
                   satellite_type: str = 'Landsat',
                   start: str = '1980-01-01',
@@ -25,7 +131,13 @@ def startWorkflow(zones_dataset: assets_management.ExtractionZones,
                   mosaic_same_day: bool = True,
                   watermask_expression: str = None,
                   activechannel_expression: str = None,
-                  vegetation_expression: str = None):
+                  vegetation_expression: str = None,
+                  time_window: int = None,
+                  balance_tasks: int = None,
+                  engine: str = 'zones',
+                  morphology: str = 'vectors',
+                  max_workers: int = 8,
+                  silent: bool = False):
     """
     Execute the classical GloUrbEE workflow for processing satellite imagery data for given extraction zones
 
@@ -46,6 +158,12 @@ def startWorkflow(zones_dataset: assets_management.ExtractionZones,
     :param watermask_expression (str, optional): Expression for water mask. Available bands are: BLUE, GREEN, RED, NIR, SWIR1, SWIR2, MNDWI, NDWI, NDVI. Defaults to 'MNDWI >  0.0'.
     :param activechannel_expression (str, optional): Expression for active channel mask. Available bands are: BLUE, GREEN, RED, NIR, SWIR1, SWIR2, MNDWI, NDWI, NDVI. Defaults to 'MNDWI > -0.4 && NDVI < 0.2'.
     :param vegetation_expression (str, optional): Expression for vegetation mask. Available bands are: BLUE, GREEN, RED, NIR, SWIR1, SWIR2, MNDWI, NDWI, NDVI. Defaults to 'NDVI > 0.15'.
+    :param time_window (int, optional): Split the date range in windows of this number of years, and export one task per zone and per window. Defaults to None (one task per zone).
+    :param balance_tasks (int, optional): Group the zones in this number of export tasks of similar workload (see scheduleZones), the heaviest tasks being started first. Defaults to None (one task per zone or pack).
+    :param engine (str, optional): Metrics engine, 'zones' (each zone reduces its own images) or 'images' (each image is read once and reduced on all the zones of the task with reduceRegions). The 'images' engine only pays off when each task holds many adjacent zones (packed datasets or balance_tasks): with one task per zone it only adds overhead. Defaults to 'zones'.
+    :param morphology (str, optional): How the polygon counts, sizes and perimeters are computed, 'vectors' (reduceToVectors) or 'raster' (connected components and pixel edges, without any vectorization; the objects larger than 1024 pixels are labelled on a grid 8 times coarser, so that large objects closer than 8 pixels are counted as one). The output columns are the same but the values are approximations of the vector ones: the perimeters follow the pixel edges (no simplification, so they are longer), and the polygons are not clipped by the same rule at the zone boundary. Defaults to 'vectors'.
+    :param max_workers (int, optional): Maximum number of computation tasks started concurrently. Defaults to 8.
+    :param silent (bool, optional): If True, do not print progress. Defaults to False.
 
     :returns workflow_id (str): Unique identifier for the executed workflow.
     """
@@ -53,77 +171,340 @@ def startWorkflow(zones_dataset: assets_management.ExtractionZones,
 
     assert satellite_type in ['Landsat', 'Sentinel-2'], ('Satellite dataset not correctly defined. Set satellite_type either to "Landsat" or "Sentinel-2"')
     assert zones_dataset.gee_state == 'complete', ('Extraction zones dataset not completely uploaded to GEE. Please upload the dataset before starting the workflow.')
+    assert engine in zones_metrics.ENGINES, (f'Metrics engine not correctly defined. Set engine to one of {zones_metrics.ENGINES}')
+    assert morphology in zones_metrics.MORPHOLOGIES, (f'Morphology mode not correctly defined. Set morphology to one of {zones_metrics.MORPHOLOGIES}')
 
     metrics_ds = assets_management.MetricsDataset(ee_project_name=zones_dataset.ee_project_name, 
                                                   parent_zones=zones_dataset)
     
-    if not vegetation_expression:
-        vegetation_expression = 'NDVI > 0.15'
+    scale = SCALES[satellite_type]
+    watermask_expression = watermask_expression or DEFAULT_EXPRESSIONS[satellite_type]['watermask_expression']
+    activechannel_expression = activechannel_expression or DEFAULT_EXPRESSIONS[satellite_type]['activechannel_expression']
+    vegetation_expression = vegetation_expression or DEFAULT_EXPRESSIONS[satellite_type]['vegetation_expression']
+
+    collection_params = {
+        'satellite_type': satellite_type,
+        'start': start,
+        'end': end,
+        'cloud_filter': cloud_filter,
+        'cloud_masking': cloud_masking,
+        'mosaic_same_day': mosaic_same_day,
+        'watermask_expression': watermask_expression,
+        'activechannel_expression': activechannel_expression,
+        'vegetation_expression': vegetation_expression
+        }
+    params = {**collection_params, 'time_window': time_window, 'engine': engine, 'morphology': morphology}
+
+    windows = timeWindows(start, end, time_window)
+    if time_window:
+        metrics_ds.windows = len(windows)
+
+    if balance_tasks:
+        plan = planWorkflow(zones_dataset, satellite_type=satellite_type, start=start, end=end, cloud_filter=cloud_filter,
+                            cloud_masking=cloud_masking, mosaic_same_day=mosaic_same_day, max_workers=max_workers, silent=silent)
+        metrics_ds.schedule = scheduleZones(plan, balance_tasks)
+
+    # Start all the computation tasks concurrently
+    tasks = prepareTasks(metrics_ds, exportTargets(metrics_ds, windows, time_window), collection_params, params)
+    metrics_ds.start_tasks(tasks, max_workers=max_workers, silent=silent)
+    
+    return metrics_ds
 
-    for i, assetData in enumerate(zones_dataset.gee_assets):
-        i+=1
-        assetName = assetData['name']
-        asset = ee.FeatureCollection(assetName)
-        
-        if satellite_type == 'Landsat':
-            scale = 30
-            if not watermask_expression:
-                watermask_expression = 'MNDWI >  0.0'
-            if not activechannel_expression:
-                activechannel_expression = 'MNDWI > -0.4 && NDVI < 0.2'
-
-            # Get the landsat image collection for your ROI
-            collection = data_management.getLandsatCollection(start=ee.Date(start), 
-                                                              end=ee.Date(end), 
-                                                              cloud_filter=cloud_filter, # Maximum cloud coverage accepted (%)
-                                                              cloud_masking=cloud_masking, # Set to False if you don't want to mask the clouds on accepted images
-                                                              mosaic_same_day=mosaic_same_day, # Set to False if you don't want to merge all images by day
-                                                              roi=asset) 
-
-        elif satellite_type == 'Sentinel-2':
-            scale = 10
-            if not watermask_expression:
-                watermask_expression = 'NDWI > -0.1'
-            if not activechannel_expression:
-                activechannel_expression = 'NDWI > -0.4 && NDVI < 0.2'
-
-            # Get the Sentinel-2 image collection for your ROI
-            collection = data_management.getSentinelCollection(start=ee.Date(start), 
-                                                              end=ee.Date(end), 
-                                                              cloud_filter=cloud_filter, # Maximum cloud coverage accepted (%)
-                                                              cloud_masking=cloud_masking, # Set to False if you don't want to mask the clouds on accepted images
-                                                              mosaic_same_day=mosaic_same_day, # Set to False if you don't want to merge all images by day
-                                                              roi=asset) 
-
-        # Calculate MNDWI, NDVI and NDWI
-        collection = classification.calculateIndicators(collection)
-
-        # Classify the objects using the indicators
-        collection = classification.classifyObjects(collection=collection, 
-                                                    watermask_expression=watermask_expression, 
-                                                    activechannel_expression=activechannel_expression, 
-                                                    vegetation_expression=vegetation_expression)
+
+def exportTargets(metrics_ds: assets_management.MetricsDataset, windows: list, time_window: int = None):
+    """
+    List the export tasks of a metrics workflow: one per zone (or pack) and per time window.
+
+    :param metrics_ds (MetricsDataset): Metrics dataset of the workflow.
+    :param windows (list): Time windows of the workflow, as returned by timeWindows().
+    :param time_window (int, optional): Length of the time windows, in years. Defaults to None (no time windows).
+
+    :returns targets (list): One dict per export task with the zones asset (or the scheduled task number and fids), the window (number, start, end), the output asset and the task description.
+    """
+    zones_dataset = metrics_ds.parent_zones
+
+    targets = []
+    for w, (window_start, window_end) in enumerate(windows):
+        window = w if time_window else None
+        window_suffix = metrics_ds.window_suffix(window)
+
+        # Taches ordonnancées : des groupes de zones, et non plus les assets de zones
+        if metrics_ds.schedule:
+            for task_number, fids in metrics_ds.schedule.items():
+                targets.append({
+                    'fids': fids,
+                    'task_number': task_number,
+                    'window': window,
+                    'start': window_start,
+                    'end': window_end,
+                    'asset': f'{metrics_ds.gee_dir}/{metrics_ds.name}_task{task_number:04}{window_suffix}',
+                    'description': f'compute {metrics_ds.asset_uuid} task {task_number:04}{window_suffix}',
+                })
+            continue
+
+        for assetData in zones_dataset.gee_assets:
+            assetName = assetData['name']
+
+            if zones_dataset.packs:
+                pack = int(assetName.split('_pack')[-1])
+                suffix, label = f'pack{pack:04}', f'pack {pack:04}'
+            else:
+                fid = int(assetName.split('_')[-1])
+                suffix, label = f'{fid:04}', f'fid {fid:04}'
+
+            targets.append({
+                'zones_asset': assetName,
+                'window': window,
+                'start': window_start,
+                'end': window_end,
+                'asset': f'{metrics_ds.gee_dir}/{metrics_ds.name}_{suffix}{window_suffix}',
+                'description': f'compute {metrics_ds.asset_uuid} {label}{window_suffix}',
+            })
+
+    return targets
+
+
+@instrumentation.phase('prepare')
+def prepareTasks(metrics_ds: assets_management.MetricsDataset, targets: list, collection_params: dict, params: dict):
+    """
+    Create the (not started) export tasks of a list of targets.
+
+    :param metrics_ds (MetricsDataset): Metrics dataset of the workflow.
+    :param targets (list): Export targets, as returned by exportTargets().
+    :param collection_params (dict): Parameters of buildCollection(), without roi.
+    :param params (dict): Workflow parameters stored in the metrics dataset config.
+
+    :returns tasks (list): The export tasks, in the targets order.
+    """
+    zones_dataset = metrics_ds.parent_zones
+    scale = SCALES[collection_params['satellite_type']]
+    roi = zones_dataset.bounds()
+
+    tasks = []
+    collections = {}
+    for target in targets:
+        # Build the preprocessed and classified collection of each window once for all the zones. The collection is only filtered on
+        # the extent of the whole dataset here: each zone filters it on its own bounds in zones_metrics.zoneMetrics
+        if target['window'] not in collections:
+            collections[target['window']] = buildCollection(roi=roi, **{**collection_params, 'start': target['start'], 'end': target['end']})
 
         # Metrics calculation
-        metrics = zones_metrics.calculateZONEsMetrics(collection=collection, zones=asset, scale=scale)
-
-        # Update the metrics dataset
-        fid = assetName.split('_')[-1]
-        metrics_ds.compute_zone_metrics(fid=fid, 
-                                        metrics=metrics,
-                                        params={                
-                                            'satellite_type': satellite_type,
-                                            'start': start,
-                                            'end': end,
-                                            'cloud_filter': cloud_filter,
-                                            'cloud_masking': cloud_masking,
-                                            'mosaic_same_day': mosaic_same_day,
-                                            'watermask_expression': watermask_expression,
-                                            'activechannel_expression': activechannel_expression,
-                                            'vegetation_expression': vegetation_expression
-                                            })
-    
-    return metrics_ds
+        if 'fids' in target:
+            # Ne charger que les assets qui contiennent les zones de la tache, et non tout le jeu de données
+            assets = sorted({zones_dataset.zone_asset(fid) for fid in target['fids']})
+            zones = ee.FeatureCollection([ee.FeatureCollection(asset) for asset in assets]).flatten()
+            zones = zones.filter(ee.Filter.inList(zones_dataset.fid_field, target['fids']))
+        else:
+            zones = ee.FeatureCollection(target['zones_asset'])
+        metrics = zones_metrics.calculateZONEsMetrics(collection=collections[target['window']], zones=zones, scale=scale,
+                                                      engine=params.get('engine') or 'zones',
+                                                      morphology=params.get('morphology') or 'vectors')
+
+        # Prepare the export task of the metrics dataset
+        if 'fids' in target:
+            tasks.append(metrics_ds.compute_task_metrics(task_number=target['task_number'], metrics=metrics, params=params, start=False, window=target['window']))
+        elif zones_dataset.packs:
+            pack = int(target['zones_asset'].split('_pack')[-1])
+            tasks.append(metrics_ds.compute_pack_metrics(pack=pack, metrics=metrics, params=params, start=False, window=target['window']))
+        else:
+            fid = target['zones_asset'].split('_')[-1]
+            tasks.append(metrics_ds.compute_zone_metrics(fid=fid, metrics=metrics, params=params, start=False, window=target['window']))
+
+    return tasks
+
+
+@instrumentation.phase('resume')
+def resumeWorkflow(metrics_ds: assets_management.MetricsDataset, max_workers: int = 8, silent: bool = False):
+    """
+    Resubmit the export tasks of a metrics workflow which are missing or failed, with the parameters stored in the config.
+
+    The zones (or packs) which already have a metrics asset or an active task are never submitted again, so resuming
+    several times is safe.
+
+    :param metrics_ds (MetricsDataset): Metrics dataset of the workflow to resume.
+    :param max_workers (int, optional): Maximum number of computation tasks started concurrently. Defaults to 8.
+    :param silent (bool, optional): If True, do not print progress. Defaults to False.
+
+    :returns report (dict): Descriptions of the export tasks 'completed', 'running', 'failed' (with a failed or cancelled operation) and 'resubmitted', the 'errors' of the tasks which could not be started, and the state of the 'config' table ('completed', 'running' or 'resubmitted').
+    """
+    assert metrics_ds.config, ('Metrics dataset has no config. Please start a new workflow.')
+
+    # Rafraichir les assets et toutes les opérations liées au jeu de données
+    metrics_ds.update_gee_state()
+
+    properties = metrics_ds.config['features'][0]['properties']
+    collection_params = {key: properties[key] for key in ['satellite_type', 'start', 'end', 'cloud_filter', 'cloud_masking', 'mosaic_same_day',
+                                                          'watermask_expression', 'activechannel_expression', 'vegetation_expression']}
+    time_window = properties.get('time_window') or None
+    params = {**collection_params, 'time_window': time_window, 'engine': properties.get('engine') or 'zones',
+              'morphology': properties.get('morphology') or 'vectors'}
+
+    targets = exportTargets(metrics_ds, timeWindows(properties['start'], properties['end'], time_window), time_window)
+
+    existing = [asset['name'] for asset in metrics_ds.counted_assets(metrics_ds.gee_assets)]
+    states = {}
+    for op in metrics_ds.tracker.operations.values():
+        states.setdefault(op['metadata'].get('description'), []).append(op['metadata']['state'])
+
+    report = {'completed': [], 'running': [], 'failed': [], 'resubmitted': [], 'errors': [], 'config': 'completed'}
+
+    # Sans table de config (export échoué ou annulé), le jeu de données n'est plus listé ni rechargeable :
+    # la réexporter depuis la config en mémoire si aucun export n'est en cours
+    if not metrics_ds.config_exported:
+        config_states = states.get(f'compute {metrics_ds.asset_uuid} config', [])
+        if any(state in task_management.ACTIVE_STATES for state in config_states):
+            report['config'] = 'running'
+        else:
+            metrics_ds.export_config()
+            report['config'] = 'resubmitted'
+
+    missing = []
+    for target in targets:
+        target_states = states.get(target['description'], [])
+
+        if target['asset'] in existing:
+            report['completed'].append(target['description'])
+            continue
+
+        if any(state in task_management.ACTIVE_STATES for state in target_states):
+            report['running'].append(target['description'])
+            continue
+
+        if any(state in task_management.FAILED_STATES + task_management.CANCELLED_STATES for state in target_states):
+            report['failed'].append(target['description'])
+        missing.append(target)
+
+    if missing:
+        tasks = prepareTasks(metrics_ds, missing, collection_params, params)
+        metrics_ds.start_tasks(tasks, max_workers=max_workers, silent=silent)
+
+        not_started = [s['item'] for s in metrics_ds.submission_errors]
+        report['resubmitted'] = [task.config.get('description') for task in tasks if task not in not_started]
+        report['errors'] = [f'{s["item"].config.get("description")}: {s["error"]}' for s in metrics_ds.submission_errors]
+
+    if not silent:
+        print(f'\n{len(report["completed"])} completed, {len(report["running"])} running, '
+              f'{len(report["failed"])} failed, {len(report["resubmitted"])} resubmitted.')
+
+    return report
+
+
+def scheduleZones(plan: pd.DataFrame, n_tasks: int, vertex_weight: float = 1):
+    """
+    Group the zones in export tasks of similar workload (longest processing time first heuristic).
+
+    The cost of a zone is its number of images times its number of pixels and vertices: the zones are taken from the
+    heaviest to the lightest, and each one is added to the least loaded task. The tasks are then numbered from the
+    heaviest to the lightest, so that the heaviest tasks are started first and the batch queue finishes evenly.
+
+    :param plan (pd.DataFrame): Workload of each zone, as returned by planWorkflow().
+    :param n_tasks (int): Number of export tasks.
+    :param vertex_weight (float, optional): Cost of a vertex, relative to the cost of a pixel. Defaults to 1.
+
+    :returns schedule (dict): Feature IDs of the zones of each task (task number -> list of fids). Empty tasks are left out.
+    """
+    assert n_tasks > 0, 'n_tasks should be a positive number of export tasks.'
+
+    costs = plan['IMAGES'] * (plan['PIXELS'] + vertex_weight * plan['VERTICES'])
+
+    loads = [(0, task) for task in range(n_tasks)]
+    tasks = {task: [] for task in range(n_tasks)}
+    task_loads = {task: 0 for task in range(n_tasks)}
+
+    for fid, cost in sorted(zip(plan['FID'], costs), key=lambda zone: zone[1], reverse=True):
+        load, task = heapq.heappop(loads)
+        tasks[task].append(int(fid))
+        task_loads[task] = load + cost
+        heapq.heappush(loads, (load + cost, task))
+
+    # Numéroter les taches de la plus lourde à la plus légère
+    ordered = sorted([task for task in tasks if tasks[task]], key=lambda task: task_loads[task], reverse=True)
+
+    return {number: tasks[task] for number, task in enumerate(ordered)}
+
+
+def zonePlan(collection, scale=30):
+    def mapZONE(zone):
+        geometry = zone.geometry()
+        area = geometry.area(maxError=1)
+        images = collection.filterBounds(geometry).size()
+        pixels = area.divide(scale * scale).round()
+
+        # Pas de géométrie dans le résultat pour alléger le getInfo
+        return ee.Feature(None, {
+            'FID': zone.get('FID'),
+            'IMAGES': images,
+            'AREA': area,
+            'PIXELS': pixels,
+            'VERTICES': geometry.coordinates().flatten().length().divide(2),
+        })
+    return mapZONE
+
+
+@instrumentation.phase('plan')
+def planWorkflow(zones_dataset: assets_management.ExtractionZones,
+                 satellite_type: str = 'Landsat',
+                 start: str = '1980-01-01',
+                 end: str = '2030-12-31',
+                 cloud_filter: int = 80,
+                 cloud_masking: bool = True,
+                 mosaic_same_day: bool = True,
+                 page_size: int = 5000,
+                 max_workers: int = 8,
+                 silent: bool = False):
+    """
+    Plan the GloUrbEE workflow without starting any export: estimate the work of each extraction zone.
+
+    The images are selected with the same date, cloud and bounds filters as startWorkflow. The weight of a zone is
+    its number of images times its number of pixels, a relative estimation of its computation cost.
+
+    :param zones_dataset (ExtractionZones): Extraction zones dataset, uploaded to GEE.
+    :param satellite_type (str, optional): Type of satellite imagery to use, 'Landsat' or 'Sentinel-2'. Defaults to 'Landsat'.
+    :param start (str, optional): Start date for image collection (inclusive), formatted as 'YYYY-MM-DD'. Defaults to '1980-01-01'.
+    :param end (str, optional): End date for image collection (inclusive), formatted as 'YYYY-MM-DD'. Defaults to '2030-12-31'.
+    :param cloud_filter (int, optional): Maximum cloud coverage accepted for images, in percentage. Defaults to 80.
+    :param cloud_masking (bool, optional): Whether to mask clouds on accepted images. Defaults to True.
+    :param mosaic_same_day (bool, optional): Whether to merge all images taken on the same day. Defaults to True.
+    :param page_size (int, optional): Number of zones fetched by each getInfo request. Defaults to 5000.
+    :param max_workers (int, optional): Maximum number of concurrent getInfo requests. Defaults to 8.
+    :param silent (bool, optional): If True, do not print the warning about zones without images. Defaults to False.
+
+    :returns plan (pd.DataFrame): One row per zone with its FID, ASSET, IMAGES, AREA (m²), PIXELS at the satellite scale, VERTICES and WEIGHT.
+    """
+    assert satellite_type in ['Landsat', 'Sentinel-2'], ('Satellite dataset not correctly defined. Set satellite_type either to "Landsat" or "Sentinel-2"')
+    assert zones_dataset.gee_state == 'complete', ('Extraction zones dataset not completely uploaded to GEE. Please upload the dataset before planning the workflow.')
+
+    scale = SCALES[satellite_type]
+
+    # Les images ne sont que comptées : pas besoin des indicateurs ni de la classification
+    if satellite_type == 'Landsat':
+        collection = data_management.getLandsatCollection(start=ee.Date(start), end=ee.Date(end), cloud_filter=cloud_filter, cloud_masking=cloud_masking,
+                                                          mosaic_same_day=mosaic_same_day, roi=zones_dataset.bounds())
+    else:
+        collection = data_management.getSentinelCollection(start=ee.Date(start), end=ee.Date(end), cloud_filter=cloud_filter, cloud_masking=cloud_masking,
+                                                           mosaic_same_day=mosaic_same_day, roi=zones_dataset.bounds())
+
+    zones = zones_dataset.all_zones()
+    plan = zones.map(lambda zone: zone.set('FID', zone.get(zones_dataset.fid_field))).map(zonePlan(collection, scale))
+
+    # Récupérer le plan par pages pour rester sous la limite de 5000 éléments du getInfo
+    offsets = range(0, zones_dataset.len, page_size)
+    outcomes = task_management.runConcurrently(lambda offset: backend.getBackend().get_info(plan.toList(page_size, offset)), offsets, max_workers=max_workers)
+    for o in outcomes:
+        if o['error']:
+            raise o['error']
+
+    df = pd.DataFrame([feature['properties'] for o in outcomes for feature in o['result']],
+                      columns=['FID', 'IMAGES', 'AREA', 'PIXELS', 'VERTICES'])
+    df['FID'] = df['FID'].astype('int64')
+    df['ASSET'] = [zones_dataset.zone_asset(fid) for fid in df['FID']]
+    df['WEIGHT'] = df['IMAGES'] * df['PIXELS']
+
+    empty = df[df['IMAGES'] == 0]
+    if len(empty) and not silent:
+        print(f'Warning: {len(empty)} zones have no image between {start} and {end}: {", ".join(str(fid) for fid in empty["FID"])}')
+
+    return df[['FID', 'ASSET', 'IMAGES', 'AREA', 'PIXELS', 'VERTICES', 'WEIGHT']]
 
 
 def workflowState(run_id):
@@ -1,266 +1,356 @@
 import ee
 
 
-def calculateCloudScore(image, zone_shape, scale):
-    
-    cloud_mask = image.unmask().select('CLOUDS').eq(0)
-    
-    cloudy_size = cloud_mask.reduceRegion(
-        reducer = ee.Reducer.sum(),
-        geometry = zone_shape.geometry(),
-        scale = scale
-    ).getNumber('CLOUDS')
-    
-    full_size = cloud_mask.reduceRegion(
-        reducer = ee.Reducer.count(),
-        geometry = zone_shape.geometry(),
-        scale = scale
-    ).getNumber('CLOUDS')
+# Moteurs de calcul des métriques : une réduction par ZONE et par image ('zones'), ou une réduction de tous les
+# ZONEs intersectés par chaque image avec reduceRegions ('images')
+ENGINES = ['zones', 'images']
+
+# Bandes de la pile des statistiques et sorties de leur réduction
+STATISTICS_BANDS = ['CLOUDS', 'COVERAGE', 'MNDWI', 'NDVI', 'BSI', 'WATER', 'WATER_MNDWI',
+                    'VEGETATION', 'VEGETATION_NDVI', 'VEGETATION_MNDWI', 'AC', 'AC_NDVI', 'AC_MNDWI']
+STATISTICS = [f'{band}_{stat}' for band in STATISTICS_BANDS for stat in ['mean', 'sum', 'count']]
+
+# Calcul des métriques de forme (nombre, taille et périmètre des polygones) : par vectorisation ('vectors'),
+# ou sur le raster seul, avec les composantes connexes et les bords des pixels ('raster')
+MORPHOLOGIES = ['vectors', 'raster']
+
+# Code (un bit par classe) de chaque classe dans l'image des classes, vectorisée une seule fois par image et par ZONE
+CLASS_CODES = {'WATER': 1, 'VEGETATION': 2}
+
+# Taille maximale (pixels) des objets étiquetés par connectedComponents (limite d'Earth Engine)
+MAX_OBJECT_SIZE = 1024
+
+# Facteur de la grille grossière où sont étiquetés les objets trop grands pour connectedComponents en mode 'raster'
+LARGE_OBJECT_FACTOR = 8
+
+
+def statisticsStack(image):
+    # Bandes réduites ensemble sur l'emprise de la zone : les moyennes sur les surfaces en eau, végétation et bande
+    # active sont celles des indices masqués par la classe, et l'aire d'une classe est la somme de sa bande (0 ou 1)
+    bands = [
+        image.select('CLOUDS').unmask().eq(0).rename('CLOUDS'),
+        image.select('red').unmask(1).rename('COVERAGE'),
+        image.select(['MNDWI', 'NDVI', 'BSI']),
+    ]
+
+    for mask, indices in [('WATER', ['MNDWI']), ('VEGETATION', ['NDVI', 'MNDWI']), ('AC', ['NDVI', 'MNDWI'])]:
+        bands.append(image.select(mask))
+        bands.append(image.select(indices).updateMask(image.select(mask)).rename([f'{mask}_{index}' for index in indices]))
+
+    return ee.Image.cat(bands)
+
+
+def statisticsReducer():
+    # Moyenne, somme et comptage de chaque bande de la pile en un seul parcours des pixels
+    # (sorties nommées BANDE_mean, BANDE_sum et BANDE_count)
+    return ee.Reducer.mean() \
+        .combine(reducer2=ee.Reducer.sum(), sharedInputs=True) \
+        .combine(reducer2=ee.Reducer.count(), sharedInputs=True)
+
+
+def zoneStatistics(image, zone, scale):
+    # Une seule réduction par image et par zone
+    return statisticsStack(image).reduceRegion(
+        reducer = statisticsReducer(),
+        geometry = zone.geometry(),
+        scale = scale,
+        maxPixels = 1e13
+    )
+
+
+def calculateCloudScore(image, zone_shape, scale, statistics=None):
+    if statistics is None:
+        statistics = zoneStatistics(image, zone_shape, scale)
+
+    cloudy_size = statistics.getNumber('CLOUDS_sum')
+    full_size = statistics.getNumber('CLOUDS_count')
     
     cloud_score = cloudy_size.divide(full_size).multiply(100).round()
 
     return cloud_score
 
 
-def calculateCoverage(image, zone_shape, scale):
+def calculateCoverage(image, zone_shape, scale, statistics=None):
     # Calculate how much an image cover a ZONE
-    
-    unmasked = image.unmask(1)
+    if statistics is None:
+        statistics = zoneStatistics(image, zone_shape, scale)
     
     total_pixels = zone_shape.area(maxError=1, proj=image.select('blue').projection())
     
-    act_pixels = unmasked.reduceRegion(
-        reducer = ee.Reducer.count(),
-        geometry = zone_shape.geometry(),
-        scale = scale,
-        maxPixels = 1e13
-    ).getNumber('red')
+    act_pixels = statistics.getNumber('COVERAGE_count')
     
     coverage_score = act_pixels.divide(total_pixels).multiply(100).round()
 
     return coverage_score
 
 
-def calculateWaterMetrics(image, zone, scale, simplify_tolerance=1.5):
-    # Vectorisation des surfaces
-    water = image.select('WATER').reduceToVectors(
+def classVectors(image, zone, scale):
+    # Image des classes codées bit à bit : chaque pixel porte la somme des codes de ses classes. Les bandes des
+    # classes sont masquées hors de la classe (voir classification) : démasquer à 0 avant de sommer, puis masquer
+    # les pixels sans classe (code 0)
+    classes = image.select('WATER').unmask(0).multiply(CLASS_CODES['WATER']) \
+        .add(image.select('VEGETATION').unmask(0).multiply(CLASS_CODES['VEGETATION'])) \
+        .int().selfMask().rename('CLASSES')
+
+    # Vectorisation des surfaces, le code étant dans l'attribut label des polygones
+    return classes.reduceToVectors(
         geometry = zone.geometry(),
         scale = scale,
         eightConnected = True,
         maxPixels = 1e12,
-        geometryType = 'polygon')
+        geometryType = 'polygon',
+        labelProperty = 'label')
+
+
+def vectorMorphology(image, band, zone, scale, simplify_tolerance=1.5, vectors=None):
+    if vectors is None:
+        vectors = classVectors(image, zone, scale)
     
-    # Séparer les surfaces en eau et les surfaces émergées
-    vector_water = water.filter("label == 1")
-    # vector_dry = water.filter("label == 0")
+    # Séparer les surfaces de la classe du reste : polygones dont le code contient le bit de la classe.
+    # Un objet dont une partie appartient aussi à l'autre classe est compté en plusieurs polygones
+    codes = [code for code in range(2 ** len(CLASS_CODES)) if code & CLASS_CODES[band]]
+    polygons = vectors.filter(ee.Filter.inList('label', codes))
     
-    # Simplifier les géométries pour le périmètre
-    geoms_water = vector_water.geometry().simplify(scale*simplify_tolerance)
+    # Fusionner les polygones de la classe (les bords communs entre codes ne sont pas des périmètres),
+    # puis simplifier les géométries pour le périmètre
+    geoms = polygons.union(maxError=1).geometry().simplify(scale*simplify_tolerance)
 
     # Calculer les percentiles de taille de polygones
-    water_percentiles = vector_water.aggregate_array('count').reduce(ee.Reducer.percentile(
+    percentiles = polygons.aggregate_array('count').reduce(ee.Reducer.percentile(
         percentiles=list(range(0,110,10)),
-        outputNames=[f'WATER_POLYGONS_p{pc}' for pc in range(0,110,10)]
+        outputNames=[f'{band}_POLYGONS_p{pc}' for pc in range(0,110,10)]
     ))
 
-    # Initialisation du dictionnaire des résultats
-    results = ee.Dictionary(water_percentiles).combine(ee.Dictionary({
-        # Calculer le nombre de polygones d'eau
-        'WATER_POLYGONS': vector_water.size(),
-
-        # Calculer l'aire des surfaces en eau
-        'WATER_AREA': image.select('WATER').reduceRegion(
-                reducer = ee.Reducer.sum(),
-                geometry = vector_water,
-                scale = scale
-            ).getNumber('WATER'),
+    return ee.Dictionary(percentiles).combine(ee.Dictionary({
+        # Calculer le nombre de polygones
+        f'{band}_POLYGONS': polygons.size(),
 
         # Calculer les périmètres
-        'WATER_PERIMETER': geoms_water.perimeter(scale),
+        f'{band}_PERIMETER': geoms.perimeter(scale),
+    }))
+
+
+def rasterMorphology(image, band, zone, scale):
+    # Masque de la classe découpé par le ZONE (comme les polygones vectorisés), à la résolution du calcul
+    projection = image.select('blue').projection().atScale(scale)
+    inside = image.select(band).unmask(0).eq(1).clip(zone.geometry()).unmask(0).reproject(projection)
+    objects = inside.selfMask()
+
+    # Etiqueter les objets (8-connexité, comme reduceToVectors). Les objets de plus de MAX_OBJECT_SIZE pixels
+    # ne sont pas étiquetés par connectedComponents : ils sont isolés dans un masque à part
+    labels = objects.connectedComponents(connectedness=ee.Kernel.square(1), maxSize=MAX_OBJECT_SIZE).select('labels')
+    large = inside.And(labels.mask().Not())
+
+    # Etiqueter les grands objets sur une grille LARGE_OBJECT_FACTOR fois plus grossière (jusqu'à MAX_OBJECT_SIZE
+    # mailles grossières), sans vectorisation. Deux grands objets à moins d'une maille grossière l'un de l'autre
+    # sont comptés comme un seul objet
+    coarse = large.reduceResolution(reducer=ee.Reducer.max(), maxPixels=(LARGE_OBJECT_FACTOR + 1) ** 2) \
+        .reproject(projection.scale(LARGE_OBJECT_FACTOR, LARGE_OBJECT_FACTOR)).selfMask()
+    large_labels = coarse.connectedComponents(connectedness=ee.Kernel.square(1), maxSize=MAX_OBJECT_SIZE) \
+        .select('labels').reproject(projection)
+
+    # Pixels des objets trop grands même pour la grille grossière : comptés comme un seul objet
+    rest = large.And(large_labels.mask().Not())
+
+    # Côtés de pixels exposés : 4 moins le nombre de voisins (4-connexité) dans l'objet
+    neighbours = inside.convolve(ee.Kernel.fixed(3, 3, [[0, 1, 0], [1, 0, 1], [0, 1, 0]]))
+    edges = inside.multiply(ee.Image(4).subtract(neighbours))
+
+    # Taille de chaque objet étiqueté, à la résolution du calcul, sur chacune des deux grilles
+    def objectSizes(mask, object_labels):
+        groups = ee.Image.cat(mask, object_labels).reduceRegion(
+            reducer = ee.Reducer.count().group(groupField=1, groupName='label'),
+            geometry = zone.geometry(),
+            scale = scale,
+            maxPixels = 1e12
+        ).get('groups')
+        return ee.List(groups).map(lambda group: ee.Dictionary(group).getNumber('count'))
+
+    # Côtés exposés et pixels restants en une seule réduction
+    totals = ee.Image.cat(edges.rename('EDGES'), rest.rename('REST')).reduceRegion(
+        reducer = ee.Reducer.sum().unweighted(),
+        geometry = zone.geometry(),
+        scale = scale,
+        maxPixels = 1e12
+    )
+    rest_count = totals.getNumber('REST')
+
+    sizes = objectSizes(objects, labels) \
+        .cat(objectSizes(large.selfMask(), large_labels)) \
+        .cat(ee.List(ee.Algorithms.If(rest_count.gt(0), [rest_count], [])))
+
+    # Calculer les percentiles de taille des objets
+    percentiles = sizes.reduce(ee.Reducer.percentile(
+        percentiles=list(range(0,110,10)),
+        outputNames=[f'{band}_POLYGONS_p{pc}' for pc in range(0,110,10)]
+    ))
+
+    return ee.Dictionary(percentiles).combine(ee.Dictionary({
+        # Nombre d'objets
+        f'{band}_POLYGONS': sizes.size(),
+
+        # Périmètre : longueur des côtés de pixels exposés (contour en escalier, sans simplification)
+        f'{band}_PERIMETER': totals.getNumber('EDGES').multiply(scale),
+    }))
+
+
+def classMorphology(image, band, zone, scale, simplify_tolerance=1.5, morphology='vectors', vectors=None):
+    if morphology == 'raster':
+        return rasterMorphology(image, band, zone, scale)
+    return vectorMorphology(image, band, zone, scale, simplify_tolerance, vectors)
+
+
+def calculateWaterMetrics(image, zone, scale, simplify_tolerance=1.5, statistics=None, morphology='vectors', vectors=None):
+    if statistics is None:
+        statistics = zoneStatistics(image, zone, scale)
+
+    # Nombre, percentiles de taille et périmètre des polygones d'eau
+    water_morphology = classMorphology(image, 'WATER', zone, scale, simplify_tolerance, morphology, vectors)
+
+    # Initialisation du dictionnaire des résultats
+    results = water_morphology.combine(ee.Dictionary({
+        # Calculer l'aire des surfaces en eau
+        'WATER_AREA': statistics.getNumber('WATER_sum'),
 
         # Calcul du mndwi moyen des surfaces en eau
-        'MEAN_WATER_MNDWI': image.select('MNDWI').reduceRegion(
-                reducer = ee.Reducer.mean(),
-                geometry = vector_water,
-                scale = scale
-            ).getNumber('MNDWI'),
-
-        # # Calcul du mndwi moyen des surfaces émergées
-        # 'MEAN_DRY_MNDWI': image.select('MNDWI').reduceRegion(
-        #         reducer = ee.Reducer.mean(),
-        #         geometry = vector_dry,
-        #         scale = scale
-        #     ).getNumber('MNDWI'),
+        'MEAN_WATER_MNDWI': statistics.getNumber('WATER_MNDWI_mean'),
 
         # Calcul du mndwi moyen de tout le ZONE
-        'MEAN_MNDWI': image.select('MNDWI').reduceRegion(
-                reducer = ee.Reducer.mean(),
-                geometry = zone.geometry(),
-                scale = scale
-            ).getNumber('MNDWI'),
-
-        'MEAN_BSI': image.select('BSI').reduceRegion(
-                reducer = ee.Reducer.mean(),
-                geometry = zone.geometry(),
-                scale = scale
-            ).getNumber('BSI'),
+        'MEAN_MNDWI': statistics.getNumber('MNDWI_mean'),
+
+        'MEAN_BSI': statistics.getNumber('BSI_mean'),
     }))
     
     return results
 
 
-def calculateVegetationMetrics(image, zone, scale, simplify_tolerance=1.5):
-    # Vectorisation des surfaces
-    vectors = image.select('VEGETATION').reduceToVectors(
-        geometry = zone.geometry(),
-        scale = scale,
-        eightConnected = True,
-        maxPixels = 1e12,
-        geometryType = 'polygon')
-    
-    # Séparer les surfaces végétation du reste
-    vector_vegetation = vectors.filter("label == 1")
-    
-    # Simplifier les géométries pour le périmètre.
-    geom_vegetation = vector_vegetation.geometry().simplify(scale*simplify_tolerance)
+def calculateVegetationMetrics(image, zone, scale, simplify_tolerance=1.5, statistics=None, morphology='vectors', vectors=None):
+    if statistics is None:
+        statistics = zoneStatistics(image, zone, scale)
 
-    # Calculer les percentiles de taille de polygones
-    veget_percentiles = vector_vegetation.aggregate_array('count').reduce(ee.Reducer.percentile(
-        percentiles=list(range(0,110,10)),
-        outputNames=[f'VEGETATION_POLYGONS_p{pc}' for pc in range(0,110,10)]
-    ))
+    # Nombre, percentiles de taille et périmètre des polygones de végétation
+    vegetation_morphology = classMorphology(image, 'VEGETATION', zone, scale, simplify_tolerance, morphology, vectors)
 
     # Initialisation du dictionnaire des résultats
-    results = ee.Dictionary(veget_percentiles).combine(ee.Dictionary({
-        # Calculer le nombre de polygones
-        'VEGETATION_POLYGONS': vector_vegetation.size(),
-
+    results = vegetation_morphology.combine(ee.Dictionary({
         # Calculer l'aire des surfaces végétation
-        'VEGETATION_AREA': image.select('VEGETATION').reduceRegion(
-            reducer = ee.Reducer.sum(),
-            geometry = vector_vegetation,
-            scale = scale
-        ).getNumber('VEGETATION'),
-        
-        # Calucler les périmètres
-        'VEGETATION_PERIMETER': geom_vegetation.perimeter(scale),
+        'VEGETATION_AREA': statistics.getNumber('VEGETATION_sum'),
         
         # Calcul du ndvi moyen des surfaces végétation
-        'MEAN_VEGETATION_NDVI': image.select('NDVI').reduceRegion(
-            reducer = ee.Reducer.mean(),
-            geometry = vector_vegetation,
-            scale = scale
-            ).getNumber('NDVI'),
+        'MEAN_VEGETATION_NDVI': statistics.getNumber('VEGETATION_NDVI_mean'),
         
         # Calcul du mndwi moyen des surfaces végétation
-        'MEAN_VEGETATION_MNDWI': image.select('MNDWI').reduceRegion(
-            reducer = ee.Reducer.mean(),
-            geometry = vector_vegetation,
-            scale = scale
-            ).getNumber('MNDWI'),
+        'MEAN_VEGETATION_MNDWI': statistics.getNumber('VEGETATION_MNDWI_mean'),
         
         # Calcul du ndvi moyen de tout le ZONE
-        'MEAN_NDVI': image.select('NDVI').reduceRegion(
-            reducer = ee.Reducer.mean(),
-            geometry = zone.geometry(),
-            scale = scale
-            ).getNumber('NDVI'),
+        'MEAN_NDVI': statistics.getNumber('NDVI_mean'),
     }))
         
     return results
 
 
-def calculateACMetrics(image, zone, scale, simplify_tolerance=1.5):
-    # Vectorisation des surfaces
-    vectors = image.select('AC').reduceToVectors(
-        geometry = zone.geometry(),
-        scale = scale,
-        eightConnected = True,
-        maxPixels = 1e12,
-        geometryType = 'polygon')
-    
-    # Séparer les surfaces végétation du reste
-    vector_ac = vectors.filter("label == 1")
+def calculateACMetrics(image, zone, scale, simplify_tolerance=1.5, statistics=None):
+    # Pas de vectorisation : toutes les métriques de la bande active viennent de la réduction de la pile
+    if statistics is None:
+        statistics = zoneStatistics(image, zone, scale)
     
     # Initialisation du dictionnaire des résultats
     results = ee.Dictionary({
-        # Calculer l'aire des surfaces végétation
-        'AC_AREA': image.select('AC').reduceRegion(
-            reducer = ee.Reducer.sum(),
-            geometry = vector_ac,
-            scale = scale
-        ).getNumber('AC'),
+        # Calculer l'aire des surfaces de bande active
+        'AC_AREA': statistics.getNumber('AC_sum'),
         
-        # Calcul du ndvi moyen des surfaces végétation
-        'MEAN_AC_NDVI': image.select('NDVI').reduceRegion(
-            reducer = ee.Reducer.mean(),
-            geometry = vector_ac,
-            scale = scale
-            ).getNumber('NDVI'),
+        # Calcul du ndvi moyen de la bande active
+        'MEAN_AC_NDVI': statistics.getNumber('AC_NDVI_mean'),
         
-        # Calcul du mndwi moyen des surfaces végétation
-        'MEAN_AC_MNDWI': image.select('MNDWI').reduceRegion(
-            reducer = ee.Reducer.mean(),
-            geometry = vector_ac,
-            scale = scale
-            ).getNumber('MNDWI'),
+        # Calcul du mndwi moyen de la bande active
+        'MEAN_AC_MNDWI': statistics.getNumber('AC_MNDWI_mean'),
     })
 
     return results
 
 
-def zoneMetrics(collection, scale=30):
+def imageMetrics(image, zone, scale, statistics, morphology='vectors'):
+    # Calculer les métriques d'une image sur un ZONE à partir des statistiques de ses pixels,
+    # et des polygones de toutes les classes vectorisées en une seule fois
+    vectors = classVectors(image, zone, scale) if morphology == 'vectors' else None
+
+    cloud_score = calculateCloudScore(image, zone, scale, statistics=statistics)
+    coverage_score = calculateCoverage(image, zone, scale, statistics=statistics)
+    water_metrics = calculateWaterMetrics(image, zone, scale, statistics=statistics, morphology=morphology, vectors=vectors)
+    vegetation_metrics = calculateVegetationMetrics(image, zone, scale, statistics=statistics, morphology=morphology, vectors=vectors)
+    ac_metrics = calculateACMetrics(image, zone, scale, statistics=statistics)
+    
+    # Créer une Feature du ZONE avec toutes les métriques de l'image
+    return zone.set(ee.Dictionary({
+        'DATE': ee.Date(image.get('system:time_start')).format("YYYY-MM-dd"),
+        'CLOUD_SCORE': cloud_score, 
+        'COVERAGE_SCORE': coverage_score,
+        'SCALE': ee.Number(scale),
+    }).combine(water_metrics).combine(vegetation_metrics).combine(ac_metrics))
+
+
+def zoneMetrics(collection, scale=30, since_field=None, morphology='vectors'):
     def mapZONE(zone):
         # Filtrer la collection d'images sur l'emprise du ZONE traité
         zone_images_collection = collection.filterBounds(zone.geometry())
 
-        # Définir une fonction qui ajoute les métriques d'une image à la liste des métriques du ZONE
-        def addMetrics(image, metrics_list):
-            # Récupérer la Feature du ZONE qui est stocké dans le premier élément de la liste
-            zone = ee.Feature(ee.List(metrics_list).get(0))
-            
-            # Calculer les métriques
-            cloud_score = calculateCloudScore(image, zone, scale)
-            coverage_score = calculateCoverage(image, zone, scale)
-            water_metrics = calculateWaterMetrics(image, zone, scale)
-            vegetation_metrics = calculateVegetationMetrics(image, zone, scale)
-            ac_metrics = calculateACMetrics(image, zone, scale)
-            
-            # Créer un dictionnaire avec toutes les métriques
-            image_metrics = zone.set(ee.Dictionary({
-                                     'DATE': ee.Date(image.get('system:time_start')).format("YYYY-MM-dd"),
-                                     'CLOUD_SCORE': cloud_score, 
-                                     'COVERAGE_SCORE': coverage_score,
-                                     'SCALE': ee.Number(scale),
-                                    }).combine(water_metrics).combine(vegetation_metrics).combine(ac_metrics))
-            
-            # Filtrer si le ZONE est 100% couvert de nuages
-            output_list = ee.Algorithms.If(ee.Number(cloud_score).gte(ee.Number(100)), ee.List(metrics_list), ee.List(metrics_list).add(image_metrics))
-            
-            # Ajouter ce dictionnaire à la liste des métriques
-            return output_list
-
-        # Stocker le ZONE traité dans le premier élément de la liste
-        first = ee.List([zone])
-
-        # Ajouter les métriques calculées sur chaque image à la liste
-        metrics = zone_images_collection.iterate(addMetrics, first)
-
-        # Supprimer le ZONE traité de la liste pour alléger le résultat
-        metrics = ee.List(metrics).remove(zone)
-
-        # Renvoyer la Feature en ajoutant l'attribut metrics
-        return zone.set({'metrics': metrics})
+        # Ne garder que les images postérieures à la date (millisecondes) stockée dans l'attribut since_field du ZONE
+        if since_field:
+            zone_images_collection = zone_images_collection.filter(ee.Filter.gt('system:time_start', zone.get(since_field)))
+            # select() renvoie un Element côté client : le refaire en Feature pour garder geometry() et area()
+            zone = ee.Feature(zone.select(zone.propertyNames().remove(since_field)))
+
+        # Un map (et non un iterate) : Earth Engine peut calculer les images en parallèle.
+        # Les pixels de la zone sont réduits une seule fois par image
+        metrics = ee.FeatureCollection(zone_images_collection.map(
+            lambda image: imageMetrics(image, zone, scale, zoneStatistics(image, zone, scale), morphology)))
+
+        # Filtrer les images où le ZONE est 100% couvert de nuages
+        return metrics.filter(ee.Filter.lt('CLOUD_SCORE', 100))
     return mapZONE
 
 
-def calculateZONEsMetrics(collection, zones, scale=30):
-    # Ajouter les listes de métriques aux attributs des ZONEs
-    metrics = zones.map(zoneMetrics(collection, scale))
+def imageZONEsMetrics(zones, scale=30, since_field=None, morphology='vectors'):
+    def mapImage(image):
+        # Ne garder que les ZONEs intersectés par l'image
+        image_zones = zones.filterBounds(image.geometry())
+
+        # Ne garder que les ZONEs dont la date (millisecondes) de l'attribut since_field est antérieure à l'image
+        if since_field:
+            image_zones = image_zones.filter(ee.Filter.lt(since_field, image.get('system:time_start')))
+
+        # Une seule lecture de l'image pour les statistiques de tous ses ZONEs
+        reduced = statisticsStack(image).reduceRegions(
+            collection = image_zones,
+            reducer = statisticsReducer(),
+            scale = scale
+        )
+
+        def mapZONE(zone):
+            # Séparer les statistiques des attributs du ZONE (une statistique sans pixel est absente : valeur nulle)
+            statistics = ee.Dictionary.fromLists(STATISTICS, [zone.get(name) for name in STATISTICS])
+            zone = ee.Feature(zone.select(zone.propertyNames().removeAll(STATISTICS + ([since_field] if since_field else []))))
+
+            return imageMetrics(image, zone, scale, statistics, morphology)
+
+        return reduced.map(mapZONE)
+
+    return mapImage
+
+
+def calculateZONEsMetrics(collection, zones, scale=30, since_field=None, engine='zones', morphology='vectors'):
+    assert engine in ENGINES, f'Unknown metrics engine "{engine}". Set engine to one of {ENGINES}.'
+    assert morphology in MORPHOLOGIES, f'Unknown morphology mode "{morphology}". Set morphology to one of {MORPHOLOGIES}.'
 
-    # Dé-empiler les métriques stockées dans un attribut de la FeatureCollection
-    unnested = ee.FeatureCollection(metrics.aggregate_array('metrics').flatten())
+    if engine == 'images':
+        # Parcourir les images une seule fois : adapté aux longs corridors de ZONEs voisins partageant les mêmes scènes.
+        # La collection couvre tout le jeu de données : ne garder que les images de l'emprise des ZONEs de la tache
+        collection = collection.filterBounds(zones.geometry().bounds(maxError=100))
+        metrics = ee.FeatureCollection(collection.map(imageZONEsMetrics(zones, scale, since_field, morphology))).flatten()
 
-    # Retourner uniquement les métriques (pas la Feature complète)
-    return unnested
+        # Filtrer les images où le ZONE est 100% couvert de nuages
+        return metrics.filter(ee.Filter.lt('CLOUD_SCORE', 100))
 
+    # Calculer une FeatureCollection de métriques par ZONE, puis les mettre à plat en une seule collection
+    # (une Feature par image et par ZONE, sans la Feature complète du ZONE)
+    return zones.map(zoneMetrics(collection, scale, since_field, morphology)).flatten()
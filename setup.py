@@ -11,6 +11,7 @@ setup(
         'geopandas',
         'earthengine-api',
         'pandas',
+        'shapely>=2.0',
         'geemap',
         'geetools==0.6.14', # mosaicSameDay deprecated in 1.0.0 :(
         # 'ipython',
@@ -22,4 +23,8 @@ setup(
         'alembic',
         'debugpy',
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+        'local': ['scipy', 'rasterio'],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import logging
+
+import pandas as pd
+
+from offline import FakeBackendTestCase, metricsTable
+from glourbee import (
+    backend,
+    assets_management,
+    collection,
+    task_management
+)
+
+
+class TestFakeBackend(FakeBackendTestCase):
+    logger = logging.getLogger(__name__)
+    logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                    datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.INFO)
+
+    def test_incomplete_backend(self):
+        class ListingBackend(backend.Backend):
+            def list_assets(self, parent: str):
+                return []
+
+        with self.assertRaises(TypeError):
+            ListingBackend()
+
+    def test_get_info(self):
+        # Rien n'est calculé par Earth Engine : sans info_factory, get_info échoue explicitement
+        with self.assertRaises(NotImplementedError):
+            self.backend.get_info(object())
+
+        bounds = {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]}
+        self.backend.info_factory = lambda obj: bounds
+        self.assertEqual(self.backend.get_info(object()), bounds)
+
+    def test_upload(self):
+        ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid='test_upload')
+        ds.upload_to_gee(silent=True)
+        ds.wait_for_tasks(silent=True, min_interval=0.01)
+
+        self.assertEqual(ds.gee_state, 'complete')
+        self.assertEqual(len(ds.gee_assets), 20)
+
+        reloaded = assets_management.ExtractionZones(asset_uuid='test_upload')
+        self.assertEqual(reloaded.len, 20)
+
+    def test_upload_packed(self):
+        ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid='test_upload_packed')
+        ds.upload_to_gee(silent=True, packs=3)
+        ds.wait_for_tasks(silent=True, min_interval=0.01)
+
+        self.assertEqual(ds.gee_state, 'complete')
+        self.assertEqual(len(ds.gee_assets), 3)
+
+        zones = collection.getGlourbeeExtractionZones(refresh=True)
+        self.assertEqual(list(zones['asset_uuid']), ['test_upload_packed'])
+
+    def test_catalog_during_upload(self):
+        ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid='test_catalog')
+        ds.upload_to_gee(silent=True)
+
+        # La config n'est pas encore exportée : le jeu de données est absent, et cette liste n'est pas mise en cache
+        self.assertEqual(len(collection.getGlourbeeExtractionZones()), 0)
+
+        ds.wait_for_tasks(silent=True, min_interval=0.01)
+        self.assertEqual(list(collection.getGlourbeeExtractionZones()['asset_uuid']), ['test_catalog'])
+
+    def test_tracker_filter(self):
+        for uuid, packs in [('test_tracker', 2), ('test_tracker_packed', 3)]:
+            ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid=uuid)
+            ds.upload_to_gee(silent=True, packs=packs)
+            ds.wait_for_tasks(silent=True, min_interval=0.01)
+
+        tracker = task_management.TaskTracker('ee-glourb', 'test_tracker')
+        tracker.refresh()
+
+        descriptions = [op['metadata']['description'] for op in tracker.operations.values()]
+        self.assertEqual(sorted(descriptions), ['upload test_tracker config', 'upload test_tracker pack 0000', 'upload test_tracker pack 0001'])
+
+    def test_unavailable_operation(self):
+        tracker = task_management.TaskTracker('ee-glourb', 'test_unavailable')
+        tracker.update({'name': 'projects/ee-glourb/operations/UNKNOWN', 'done': False,
+                        'metadata': {'description': 'upload test_unavailable config', 'state': 'RUNNING'}})
+        failed = []
+
+        # L'opération n'existe pas : elle est en échec après max_errors tentatives au lieu de bloquer l'attente
+        monitor = task_management.TaskMonitor(tracker, min_interval=0.01, max_errors=3, on_failed=failed.append)
+        monitor.wait(silent=True)
+
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(monitor.errors[failed[0]['name']], 3)
+        self.assertIn('not found', failed[0]['error']['message'])
+
+    def test_failed_tasks(self):
+        self.backend.task_failure_rate = 1
+        failed = []
+
+        ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid='test_failed')
+        ds.upload_to_gee(silent=True, packs=2)
+        ds.wait_for_tasks(silent=True, min_interval=0.01, on_failed=failed.append)
+
+        self.assertEqual(len(failed), 3)
+        self.assertEqual(ds.gee_state, 'none')
+
+    def test_download(self):
+        zones = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid='test_download')
+        zones.upload_to_gee(silent=True, packs=2)
+        zones.wait_for_tasks(silent=True, min_interval=0.01)
+
+        metrics_ds = assets_management.MetricsDataset(parent_zones=zones)
+        params = {'satellite_type': 'Landsat', 'start': '1990-01-01', 'end': '1990-12-31', 'cloud_filter': 80,
+                  'cloud_masking': True, 'mosaic_same_day': True, 'watermask_expression': '',
+                  'activechannel_expression': '', 'vegetation_expression': ''}
+        for pack, fids in enumerate([range(0, 10), range(10, 20)]):
+            metrics_ds.compute_pack_metrics(pack=pack, metrics=metricsTable(fids, ['1990-01-01', '1990-02-01']), params=params, silent=True)
+        metrics_ds.wait_for_tasks(silent=True, min_interval=0.01)
+        self.assertEqual(metrics_ds.gee_state, 'complete')
+
+        output_file = os.path.join(self.tmpdir, 'metrics.parquet')
+        metrics_ds.download(output_file, silent=True, cache_dir=os.path.join(self.tmpdir, 'cache'))
+
+        df = pd.read_parquet(output_file)
+        self.assertEqual(len(df), 40)
+        self.assertEqual(sorted(df['ID'].unique()), list(range(20)))
+
+    def test_delete(self):
+        ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid='test_delete')
+        ds.upload_to_gee(silent=True)
+        ds.wait_for_tasks(silent=True, min_interval=0.01)
+
+        deleted = ds.delete(silent=True)
+
+        self.assertEqual(len(deleted), 22)
+        self.assertNotIn(ds.gee_dir, self.backend.assets)
+
+    def test_request_failures(self):
+        self.backend.failure_rate = 1
+
+        with self.assertRaises(Exception):
+            self.backend.list_assets('projects/ee-glourb/assets/extraction_zones')
@@ -36,15 +36,52 @@ class TestExtractionZones(unittest.TestCase):
         ds.update_gee_state()
 
         self.logger.info('Uploading asset to GEE')
+        previous = set(ds.tracker.operations)
         ds.upload_to_gee(silent=True)
         self.assertTrue(len(ds.linked_tasks) > 0)
+        uploaded = set(ds.tracker.operations) - previous
+
+        self.logger.info('Waiting for tasks to complete')
+        completed = []
+        monitor = ds.wait_for_tasks(silent=True, on_completed=completed.append)
+
+        # Les taches des exécutions précédentes restent suivies : ne compter que celles de cet upload
+        timings = monitor.timings()
+        self.assertEqual(len(completed), ds.len + 1)
+        self.assertEqual(len(timings[timings['name'].isin(uploaded)]), ds.len + 1)
+        self.assertEqual(len(uploaded), ds.len + 1)
+        self.assertEqual(len(ds.gee_assets), ds.len)
+        self.assertEqual(ds.gee_state, 'complete')
+
+        self.logger.info('Cleanup')
+        ds.delete()
+
+    def test_upload_packed(self):
+        self.logger.info('Creating asset')
+        ds = assets_management.ExtractionZones(local_file='./tests/data/lhasa_testing.shp',
+                                               ee_project_name=ee_project_name,
+                                               asset_uuid='test_upload_packed')
+
+        self.logger.info('Deleting previous test residuals')
+        ds.delete()
+        ds.update_gee_state()
+
+        self.logger.info('Uploading packed asset to GEE')
+        ds.upload_to_gee(silent=True, packs=2)
+        self.assertEqual(len(ds.zones_index), ds.len)
 
         self.logger.info('Waiting for tasks to complete')
         ds.wait_for_tasks(silent=True)
 
-        self.assertEqual(len(ds.gee_assets), ds.len)
+        self.assertEqual(len(ds.gee_assets), 2)
         self.assertEqual(ds.gee_state, 'complete')
 
+        self.logger.info('Reloading asset from GEE')
+        reloaded = assets_management.ExtractionZones(ee_project_name=ee_project_name,
+                                                     asset_uuid='test_upload_packed')
+        self.assertEqual(reloaded.packs, 2)
+        self.assertEqual(reloaded.zones_index, ds.zones_index)
+
         self.logger.info('Cleanup')
         ds.delete()
 
@@ -62,8 +99,14 @@ class TestExtractionZones(unittest.TestCase):
         ds.upload_to_gee(silent=True)
         ds.wait_for_tasks(silent=True)
 
+        self.logger.info('Listing assets to delete')
+        to_delete = ds.delete(dry_run=True)
+        self.assertEqual(len(to_delete), ds.len + 2)
+        self.assertEqual(to_delete[-1], ds.gee_dir)
+
         self.logger.info('Deleting asset')
-        ds.delete()
+        deleted = ds.delete(silent=True)
+        self.assertEqual(deleted, to_delete)
 
         zones = ee.data.listAssets({'parent': f'projects/{ee_project_name}/assets/extraction_zones'})
         zone_names = [z['name'] for z in zones['assets']]
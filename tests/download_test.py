@@ -0,0 +1,84 @@
+import os
+import logging
+
+import pandas as pd
+
+from offline import FakeBackendTestCase, metricsTable
+from glourbee import (
+    backend,
+    instrumentation,
+    download_management
+)
+
+
+class TestDownloadCache(FakeBackendTestCase):
+    logger = logging.getLogger(__name__)
+    logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                    datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.INFO)
+
+    def setUp(self):
+        super().setUp()
+
+        folder = 'projects/ee-glourb/assets/extraction_zones/test_download_cache'
+        self.backend.create_folder(folder)
+        for fid in range(3):
+            self.backend.add_table(f'{folder}/metrics_{fid:04}', metricsTable([fid], ['1990-01-01', '1990-02-01']))
+        self.assets = backend.getBackend().list_assets(folder)
+
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+
+    def download(self, assets, cache):
+        # Nombre de tables réellement téléchargées (et non lues dans le cache)
+        with instrumentation.instrument(log_summary=False) as recording:
+            tables = download_management.downloadTables(assets, cache=cache)
+        return tables, recording.counts().get('download_url', 0)
+
+    def test_hits_and_misses(self):
+        cache = download_management.DownloadCache(self.cache_dir)
+        tables, downloads = self.download(self.assets, cache)
+        self.assertEqual(downloads, 3)
+
+        cached, downloads = self.download(self.assets, cache)
+        self.assertEqual(downloads, 0)
+        self.assertTrue(all(t.equals(c) for t, c in zip(tables, cached)))
+
+        # Un asset recalculé (nouvel updateTime) est téléchargé à nouveau
+        assets = [dict(asset) for asset in self.assets]
+        assets[1]['updateTime'] = '2100-01-01T00:00:00Z'
+        _, downloads = self.download(assets, cache)
+        self.assertEqual(downloads, 1)
+
+    def test_resume(self):
+        # Téléchargement interrompu après deux assets, et dernière ligne du manifeste tronquée
+        self.download(self.assets[:2], download_management.DownloadCache(self.cache_dir))
+        with open(os.path.join(self.cache_dir, 'manifest.jsonl'), 'a') as f:
+            f.write('{"name": "projects/ee-glourb/assets/extraction_')
+
+        # Le manifeste est relu : seul le dernier asset est téléchargé
+        _, downloads = self.download(self.assets, download_management.DownloadCache(self.cache_dir))
+        self.assertEqual(downloads, 1)
+
+    def test_prune(self):
+        cache = download_management.DownloadCache(self.cache_dir)
+        self.download(self.assets, cache)
+
+        cache.prune(self.assets[:1])
+
+        self.assertEqual(list(cache.manifest), [self.assets[0]['name']])
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ['manifest.jsonl', 'metrics_0000.pkl'])
+        with open(cache.manifest_file) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        # Le manifeste compacté est relu tel quel
+        self.assertEqual(list(download_management.DownloadCache(self.cache_dir).manifest), [self.assets[0]['name']])
+
+    def test_partitions_replaced(self):
+        output_dir = os.path.join(self.tmpdir, 'metrics.parquet')
+
+        for assets in [self.assets, self.assets[:1]]:
+            tables = download_management.downloadTables(assets, process=lambda df: download_management.cleanMetrics(df, 'DGO_FID'))
+            download_management.writeMetrics(pd.concat(tables), output_dir, 'DGO_FID', partition_by='fid')
+
+        # Les partitions du premier téléchargement ne sont plus lues
+        self.assertEqual(os.listdir(output_dir), ['ID=0'])
+        self.assertEqual(pd.read_parquet(output_dir)['DGO_FID'].unique().tolist(), [0])
@@ -0,0 +1,70 @@
+import logging
+
+import pandas as pd
+
+from offline import FakeBackendTestCase
+from glourbee import (
+    backend,
+    instrumentation,
+    assets_management,
+    collection
+)
+
+
+class TestInstrumentation(FakeBackendTestCase):
+    n_zones = 10
+    task_duration = 0
+
+    logger = logging.getLogger(__name__)
+    logging.basicConfig(format = '%(asctime)s %(module)s %(levelname)s: %(message)s',
+                    datefmt = '%m/%d/%Y %I:%M:%S %p', level = logging.INFO)
+
+    def test_upload(self):
+        with instrumentation.instrument() as recording:
+            ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid='test_instrumentation')
+            ds.upload_to_gee(silent=True)
+            ds.wait_for_tasks(silent=True, min_interval=0.01)
+
+        # Le backend d'origine est restauré à la fin du bloc
+        self.assertIs(backend.getBackend(), self.backend)
+
+        # Une tache par zone plus la config, démarrées dans les threads de startTasks
+        self.assertEqual(recording.counts()['start'], 11)
+
+        summary = recording.summary()
+        starts = summary[summary['CALL'] == 'start']
+        self.assertEqual(set(starts['PHASE']), {'upload', 'upload/submit'})
+        self.assertEqual(starts.loc[starts['PHASE'] == 'upload/submit', 'SITE'].item(), 'task_management.startTasks')
+        self.assertIn('wait', list(summary['PHASE']))
+
+    def test_catalog(self):
+        for uuid in ['test_catalog_a', 'test_catalog_b']:
+            ds = assets_management.ExtractionZones(local_file=self.zones_file, asset_uuid=uuid)
+            ds.upload_to_gee(silent=True, packs=2)
+            ds.wait_for_tasks(silent=True, min_interval=0.01)
+        collection.getGlourbeeMetrics(zones_uuid='test_catalog_a')
+
+        with instrumentation.instrument() as recording:
+            zones = collection.getGlourbeeExtractionZones(refresh=True)
+
+        # Un seul listing de la racine et une seule requête pour les configs
+        self.assertEqual(recording.counts(), {'list_assets': 1, 'first_features': 1})
+
+        # Seuls les calculs déjà listés sont comptés
+        counts = dict(zip(zones['asset_uuid'], zones['metrics_ds']))
+        self.assertEqual(counts['test_catalog_a'], 0)
+        self.assertTrue(pd.isna(counts['test_catalog_b']))
+
+    def test_errors(self):
+        self.backend.failure_rate = 1
+
+        with instrumentation.instrument() as recording:
+            with self.assertRaises(Exception):
+                self.backend_call()
+
+        summary = recording.summary(by=['CALL', 'SITE'])
+        self.assertEqual(summary['ERRORS'].item(), 1)
+        self.assertEqual(summary['SITE'].item(), 'instrumentation_test.TestInstrumentation.backend_call')
+
+    def backend_call(self):
+        backend.getBackend().list_assets('projects/ee-glourb/assets/extraction_zones')
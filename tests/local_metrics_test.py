@@ -0,0 +1,50 @@
+import unittest
+
+import shapely
+import numpy as np
+import geopandas as gpd
+
+from glourbee import local_metrics
+
+
+class TestLocalMetrics(unittest.TestCase):
+    def setUp(self):
+        # 3 images de 40x60 pixels de 30 m, avec deux plans d'eau de 10x10 pixels sur la zone 1
+        rng = np.random.default_rng(0)
+        self.stack = {band: rng.uniform(0.05, 0.1, (3, 40, 60)).astype('float32') for band in local_metrics.BANDS}
+        self.stack['green'][:] = 0.05
+        self.stack['swir1'][:] = 0.1
+        for rows, cols in [(slice(5, 15), slice(5, 15)), (slice(20, 30), slice(5, 15))]:
+            self.stack['green'][:, rows, cols] = 0.4
+            self.stack['swir1'][:, rows, cols] = 0.05
+        self.stack['CLOUDS'] = np.ones((3, 40, 60), dtype='float32')
+        self.stack['CLOUDS'][2] = 0
+
+        self.transform = (30, 0, 0, 0, -30, 1200)
+        self.zones = gpd.GeoDataFrame({'DGO_FID': [1, 2]},
+                                      geometry=[shapely.box(0, 0, 900, 1200), shapely.box(900, 0, 1800, 1200)])
+        self.dates = ['2020-01-01', '2020-02-01', '2020-03-01']
+
+    def test_expression(self):
+        variables = {'MNDWI': np.array([0.0, -0.5, 0.0]), 'NDVI': np.array([0.1, 0.1, 0.3])}
+        result = local_metrics.evaluateExpression('MNDWI > -0.4 && NDVI < 0.2', variables)
+
+        self.assertEqual(result.tolist(), [True, False, False])
+        self.assertEqual(local_metrics.evaluateExpression('!(NDVI < 0.2) || MNDWI != 0', variables).tolist(), [False, True, True])
+
+    def test_zones_metrics(self):
+        df = local_metrics.zonesMetrics(self.stack, self.dates, self.zones, self.transform)
+
+        # La 3e image est entièrement nuageuse
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df['DATE'].unique().tolist(), self.dates[:2])
+
+        zone1 = df[df['DGO_FID'] == 1].iloc[0]
+        self.assertEqual(zone1['WATER_POLYGONS'], 2)
+        self.assertEqual(zone1['WATER_POLYGONS_p50'], zone1['WATER_AREA'] / 2)
+        self.assertEqual(zone1['CLOUD_SCORE'], 0)
+        self.assertEqual(zone1['COVERAGE_SCORE'], 100)
+
+        zone2 = df[df['DGO_FID'] == 2].iloc[0]
+        self.assertEqual(zone2['WATER_POLYGONS'], 0)
+        self.assertTrue(np.isnan(zone2['WATER_POLYGONS_p50']))
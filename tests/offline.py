@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import shapely
+import geopandas as gpd
+
+from ee import apitestcase
+
+from glourbee import (
+    backend,
+    collection
+)
+
+
+def metricsTable(fids, dates):
+    # Table de métriques factice, au format des exports de zones_metrics
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'id': f'{fid}_{date}',
+                'properties': {'DGO_FID': fid, 'DATE': date, 'WATER_AREA': 10.0 * fid},
+                'geometry': {'type': 'Polygon', 'coordinates': [[[fid, 0], [fid + 1, 0], [fid + 1, 1], [fid, 0]]]},
+            }
+            for fid in fids for date in dates
+        ]
+    }
+
+
+class FakeBackendTestCase(unittest.TestCase):
+    """
+    Test case running on a FakeBackend, with a local catalog cache and a file of n_zones synthetic zones.
+    """
+    n_zones = 20
+    task_duration = 0.01
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='glourbee_test_')
+        self.catalog_dir = collection.CATALOG_DIR
+        collection.CATALOG_DIR = os.path.join(self.tmpdir, 'catalog')
+
+        self.zones_file = os.path.join(self.tmpdir, 'zones.gpkg')
+        gpd.GeoDataFrame({'DGO_FID': range(self.n_zones)},
+                         geometry=[shapely.box(i * 100, 0, i * 100 + 90, 90) for i in range(self.n_zones)],
+                         crs=2154).to_file(self.zones_file)
+
+        self.backend = backend.FakeBackend(task_duration=self.task_duration, seed=0)
+        self.previous = backend.getBackend()
+        backend.setBackend(self.backend)
+
+    def tearDown(self):
+        backend.setBackend(self.previous)
+        collection.CATALOG_DIR = self.catalog_dir
+        shutil.rmtree(self.tmpdir)
+
+
+class EarthEngineTestCase(apitestcase.ApiTestCase):
+    """
+    Test case with the ee module initialized offline by the ApiTestCase harness of earthengine-api, from the
+    algorithms signatures it ships: Earth Engine objects can be built and serialized, but not computed.
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        # geetools (importé par workflow) a besoin d'un module ee initialisé
+        from glourbee import workflow
+        self.workflow = workflow
@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from offline import EarthEngineTestCase
+
+
+class TestPlanning(EarthEngineTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # Charges synthétiques très inégales, comme des ZONEs de tailles et de recouvrements différents
+        rng = np.random.default_rng(0)
+        self.plan = pd.DataFrame({
+            'FID': range(200),
+            'IMAGES': rng.integers(10, 500, 200),
+            'PIXELS': rng.lognormal(6, 1.5, 200).round(),
+            'VERTICES': rng.integers(5, 200, 200),
+        })
+        self.costs = dict(zip(self.plan['FID'], self.plan['IMAGES'] * (self.plan['PIXELS'] + self.plan['VERTICES'])))
+
+    def test_schedule_zones(self):
+        schedule = self.workflow.scheduleZones(self.plan, n_tasks=8)
+        self.assertEqual(sorted(schedule), list(range(8)))
+
+        # Chaque ZONE est dans une et une seule tache
+        fids = [fid for task in schedule.values() for fid in task]
+        self.assertEqual(sorted(fids), list(range(200)))
+
+        # LPT : la tache la plus chargée reste sous 4/3 de l'optimum, et l'écart entre taches ne dépasse pas le coût
+        # du plus gros ZONE
+        loads = [sum(self.costs[fid] for fid in task) for task in schedule.values()]
+        optimum = max(sum(loads) / 8, max(self.costs.values()))
+        self.assertLessEqual(max(loads), 4 / 3 * optimum)
+        self.assertLessEqual(max(loads) - min(loads), max(self.costs.values()))
+
+        # Les taches sont numérotées de la plus lourde à la plus légère
+        self.assertEqual(loads, sorted(loads, reverse=True))
+
+    def test_schedule_more_tasks_than_zones(self):
+        schedule = self.workflow.scheduleZones(self.plan.head(3), n_tasks=5)
+
+        # Les taches vides sont écartées
+        self.assertEqual(sorted(len(task) for task in schedule.values()), [1, 1, 1])
+        self.assertEqual(sorted(schedule), [0, 1, 2])
+
+    def test_time_windows(self):
+        windows = self.workflow.timeWindows('1990-01-01', '1992-07-01', years=1)
+
+        # 2,5 ans en fenêtres d'un an : la dernière est plus courte et se termine à la fin de la période
+        self.assertEqual(windows, [('1990-01-01', '1991-01-01'), ('1991-01-01', '1992-01-01'), ('1992-01-01', '1992-07-01')])
+
+        # Fenêtres contiguës : la fin (exclue par filterDate) d'une fenêtre est le début de la suivante
+        for (_, end), (start, _) in zip(windows[:-1], windows[1:]):
+            self.assertEqual(end, start)
+
+        # Chaque date de la période, bornes comprises, est dans une seule fenêtre [début, fin[
+        for date in ['1990-01-01', '1990-12-31', '1991-01-01', '1992-01-01', '1992-06-30']:
+            self.assertEqual(len([w for w in windows if w[0] <= date < w[1]]), 1)
+        self.assertEqual(len([w for w in windows if w[0] <= '1992-07-01' < w[1]]), 0)
+
+    def test_single_time_window(self):
+        self.assertEqual(self.workflow.timeWindows('1990-01-01', '1992-07-01'), [('1990-01-01', '1992-07-01')])
+        self.assertEqual(self.workflow.timeWindows('1990-01-01', '1994-01-01', years=5), [('1990-01-01', '1994-01-01')])
+
+
+if __name__ == '__main__':
+    unittest.main()
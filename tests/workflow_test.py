@@ -37,6 +37,17 @@ class TestWorkflow(unittest.TestCase):
             self.logger.info('Extraction zones already uploaded to GEE')
 
     
+    def test_plan_workflow(self):
+        self.logger.info('Planning metrics calculation workflow for Landsat images')
+        plan = workflow.planWorkflow(zones_dataset=self.zones,
+                  satellite_type = 'Landsat',
+                  start = '1990-01-01',
+                  end = '1990-01-31',
+                  mosaic_same_day=False)
+
+        self.assertEqual(len(plan), self.zones.len)
+        self.assertTrue((plan['WEIGHT'] == plan['IMAGES'] * plan['PIXELS']).all())
+
     def test_start_and_cancel_workflow(self):
         self.logger.info('Starting metrics calculation workflow for Landsat images')
         metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
@@ -52,6 +63,66 @@ class TestWorkflow(unittest.TestCase):
 
         metrics_ds.delete(silent=False)
 
+    def test_images_engine_workflow(self):
+        self.logger.info('Starting metrics calculation workflow with the reduceRegions engine')
+        metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
+                  satellite_type = 'Landsat',
+                  start = '1990-01-01',
+                  end = '1990-01-31',
+                  mosaic_same_day=False,
+                  engine='images')
+
+        self.assertTrue(len(metrics_ds.linked_tasks) > 0)
+        self.assertEqual(metrics_ds.config['features'][0]['properties']['engine'], 'images')
+
+        metrics_ds.cancel_linked_tasks(silent=False)
+        metrics_ds.delete(silent=False)
+
+    def test_raster_morphology_workflow(self):
+        self.logger.info('Starting metrics calculation workflow without vectorization')
+        metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
+                  satellite_type = 'Landsat',
+                  start = '1990-01-01',
+                  end = '1990-01-31',
+                  mosaic_same_day=False,
+                  morphology='raster')
+
+        self.assertTrue(len(metrics_ds.linked_tasks) > 0)
+        self.assertEqual(metrics_ds.config['features'][0]['properties']['morphology'], 'raster')
+
+        metrics_ds.cancel_linked_tasks(silent=False)
+        metrics_ds.delete(silent=False)
+
+    def test_windowed_workflow(self):
+        self.logger.info('Starting metrics calculation workflow split in yearly windows')
+        metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
+                  satellite_type = 'Landsat',
+                  start = '1990-01-01',
+                  end = '1992-01-01',
+                  mosaic_same_day=False,
+                  time_window=1)
+
+        self.assertEqual(metrics_ds.windows, 2)
+        self.assertEqual(metrics_ds.n_assets, 2 * self.zones.n_assets)
+
+        metrics_ds.cancel_linked_tasks(silent=False)
+        metrics_ds.delete(silent=False)
+
+    def test_balanced_workflow(self):
+        self.logger.info('Starting metrics calculation workflow balanced in 2 export tasks')
+        metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
+                  satellite_type = 'Landsat',
+                  start = '1990-01-01',
+                  end = '1990-01-31',
+                  mosaic_same_day=False,
+                  balance_tasks=2)
+
+        self.assertEqual(metrics_ds.n_assets, len(metrics_ds.schedule))
+        self.assertEqual(sum(len(fids) for fids in metrics_ds.schedule.values()), self.zones.len)
+
+        metrics_ds.cancel_linked_tasks(silent=False)
+        metrics_ds.delete(silent=False)
+
     def test_landsat_workflow(self):
         self.logger.info('Starting metrics calculation workflow for Landsat images')
         metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
@@ -65,4 +136,49 @@ class TestWorkflow(unittest.TestCase):
         metrics_ds.wait_for_tasks(silent=False)
         self.assertTrue(metrics_ds.gee_state == 'complete')
 
-        metrics_ds.delete(silent=False)
\ No newline at end of file
+        metrics_ds.delete(silent=False)
+
+    def test_append_new_acquisitions(self):
+        self.logger.info('Starting metrics calculation workflow for Landsat images')
+        metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
+                  satellite_type = 'Landsat',
+                  start = '1990-01-01',
+                  end = '1990-01-31',
+                  mosaic_same_day=False)
+        metrics_ds.wait_for_tasks(silent=False)
+
+        self.logger.info('Appending the acquisitions of February 1990')
+        metrics_ds.append_new_acquisitions(end='1990-03-01')
+        metrics_ds.wait_for_tasks(silent=False)
+
+        self.assertTrue(metrics_ds.gee_state == 'complete')
+        self.assertEqual(len(metrics_ds.gee_assets), 2 * metrics_ds.n_assets)
+
+        metrics_ds.delete(silent=False)
+
+    def test_resume_workflow(self):
+        self.logger.info('Starting and cancelling metrics calculation workflow')
+        metrics_ds = workflow.startWorkflow(zones_dataset=self.zones,
+                  satellite_type = 'Landsat',
+                  start = '1990-01-01',
+                  end = '1990-01-31',
+                  mosaic_same_day=False)
+        metrics_ds.cancel_linked_tasks(silent=False)
+
+        self.logger.info('Resuming the cancelled workflow')
+        report = workflow.resumeWorkflow(metrics_ds)
+        self.assertEqual(len(report['resubmitted']), metrics_ds.n_assets)
+        self.assertIn(report['config'], ['completed', 'resubmitted'])
+
+        # Les taches relancées sont actives : rien ne doit être soumis une seconde fois
+        report = workflow.resumeWorkflow(metrics_ds)
+        self.assertEqual(len(report['resubmitted']), 0)
+
+        metrics_ds.wait_for_tasks(silent=False)
+        self.assertTrue(metrics_ds.gee_state == 'complete')
+
+        # La config doit exister pour recharger le jeu de données
+        reloaded = assets_management.MetricsDataset(parent_zones=self.zones, asset_uuid=metrics_ds.asset_uuid)
+        self.assertIsNotNone(reloaded.config)
+
+        metrics_ds.delete(silent=False)
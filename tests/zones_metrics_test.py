@@ -0,0 +1,42 @@
+import itertools
+import unittest
+
+import ee
+
+from offline import EarthEngineTestCase
+from glourbee import zones_metrics
+
+
+class TestMetricsGraph(EarthEngineTestCase):
+    """
+    Build the metrics graphs client-side, without credentials.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.collection = self.workflow.buildCollection(start='1990-01-01', end='1990-12-31',
+                                                        roi=ee.Geometry.Rectangle([90.9, 29.6, 91.2, 29.7]))
+        self.zones = ee.FeatureCollection('projects/ee-glourb/assets/extraction_zones/test_graph/zones')
+
+    def assertGraph(self, engines):
+        for engine, morphology, since_field in itertools.product(engines, zones_metrics.MORPHOLOGIES, [None, 'SINCE']):
+            with self.subTest(engine=engine, morphology=morphology, since_field=since_field):
+                metrics = zones_metrics.calculateZONEsMetrics(self.collection, self.zones, scale=30, since_field=since_field,
+                                                              engine=engine, morphology=morphology)
+                self.assertIsInstance(metrics, ee.FeatureCollection)
+                self.assertTrue(ee.serializer.toJSON(metrics))
+
+    def test_zones_engine(self):
+        self.assertGraph(['zones'])
+
+    def test_images_engine(self):
+        self.assertGraph(['images'])
+
+    def test_raster_morphology(self):
+        for engine in zones_metrics.ENGINES:
+            metrics = zones_metrics.calculateZONEsMetrics(self.collection, self.zones, scale=30, engine=engine, morphology='raster')
+            self.assertNotIn('reduceToVectors', ee.serializer.toJSON(metrics))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -33,7 +33,7 @@ select_zones = st.dataframe(
     hide_index=True,
     column_config={
         "asset_uuid": "UUID",
-        "metrics_ds": "Number of metrics datasets",
+        "metrics_ds": None,
         "zones_author": "Author",
         "description": "Description",
         "len": "Number of polygons",
@@ -75,8 +75,8 @@ if "extraction_zones" in st.session_state and st.session_state['extraction_zones
         st.warning(
             f'This asset is not completely uploaded ({current_state}). Please wait until the upload is finished.', icon="🚨")
     else:
-        st.session_state['extraction_zones']['features'] = ee.FeatureCollection([ee.Feature(ee.FeatureCollection(
-            asset['id']).first()) for asset in st.session_state['zones_dataset'].gee_assets])
+        st.session_state['extraction_zones']['features'] = ee.FeatureCollection([ee.FeatureCollection(
+            asset['id']) for asset in st.session_state['zones_dataset'].gee_assets]).flatten()
 
         map = geemap.Map()
         map.addLayer(st.session_state['extraction_zones']['features'], name='Extraction Zones')
@@ -159,4 +159,5 @@ with st.form('upload_new'):
                                                                   )
                     new_asset.upload_to_gee()
 
+                del st.session_state['assets']
                 st.rerun()